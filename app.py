@@ -5,6 +5,7 @@ Flask application with HTMX for real-time progress and file management.
 from __future__ import annotations
 
 import json
+import os
 import sqlite3
 import threading
 import uuid
@@ -14,22 +15,72 @@ from queue import Queue, Empty
 from typing import Optional
 
 from flask import Flask, render_template, request, jsonify, Response, send_file
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson  # Optional: faster encoding of progress events
+except ImportError:
+    orjson = None
 
 from batch_wrapper import run_batch, BatchProgress, BatchResult, auto_detect_files, count_xml_files
 
 app = Flask(__name__)
 
+
+class OrjsonProvider(DefaultJSONProvider):
+    """jsonify and request bodies through orjson, keeping Flask's sorted keys and type handling.
+
+    Indented (debug) output and anything orjson rejects go through the stdlib provider.
+    """
+
+    def dumps(self, obj, **kwargs) -> str:
+        if 'indent' not in kwargs:
+            try:
+                return orjson.dumps(obj, default=self.default, option=orjson.OPT_SORT_KEYS
+                                    | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS).decode()
+            except TypeError:
+                pass
+        return super().dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        # Request bodies arrive as bytes; orjson parses them without a text decode
+        if not kwargs:
+            try:
+                return orjson.loads(s)
+            except orjson.JSONDecodeError:
+                pass
+        return super().loads(s, **kwargs)
+
+
+if orjson is not None:
+    app.json = OrjsonProvider(app)
+
 # Configuration
 BASE_DIR = Path(__file__).parent
 DB_PATH = BASE_DIR / 'history.db'
 DEFAULT_MAP_PATH = BASE_DIR / 'Map Updated 8152025.xlsx'
-ALLOWED_ROOTS = [Path.home() / 'Desktop', Path.home() / 'Documents', Path.home()]
+HOME_DIR = Path.home()
+DESKTOP_DIR = HOME_DIR / 'Desktop'
+ALLOWED_ROOTS = [DESKTOP_DIR, HOME_DIR / 'Documents', HOME_DIR]
 
 # Global state for progress tracking
 progress_queues: dict[str, Queue] = {}
 job_results: dict[str, BatchResult] = {}
 
 
+def _sse_event(obj) -> bytes:
+    """Encode one SSE data frame, using orjson's bytes directly when it is installed."""
+    if orjson is not None:
+        return b'data: ' + orjson.dumps(obj) + b'\n\n'
+    # Match orjson's compact, non-ASCII-escaping output
+    return f"data: {json.dumps(obj, ensure_ascii=False, separators=(',', ':'))}\n\n".encode()
+
+
+# Constant frames, encoded once
+_SSE_HEARTBEAT = _sse_event({'type': 'heartbeat'})
+_SSE_UNKNOWN_JOB = _sse_event({'type': 'error', 'message': 'Unknown job'})
+
+
 # Database setup
 def init_db():
     """Initialize SQLite database."""
@@ -110,15 +161,16 @@ def index():
 @app.route('/api/files/list')
 def list_files():
     """List directory contents for file browser."""
-    path_str = request.args.get('path', str(Path.home() / 'Desktop'))
+    path_str = request.args.get('path', str(DESKTOP_DIR))
     path = Path(path_str)
+    exists = path.exists()
 
     # Security check
-    if not any(path == root or (path.exists() and root in path.parents) for root in ALLOWED_ROOTS):
-        if path != Path.home() and path not in ALLOWED_ROOTS:
+    if not any(path == root or (exists and root in path.parents) for root in ALLOWED_ROOTS):
+        if path != HOME_DIR and path not in ALLOWED_ROOTS:
             return jsonify({'error': 'Access denied'}), 403
 
-    if not path.exists():
+    if not exists:
         return jsonify({'error': 'Path not found'}), 404
 
     if not path.is_dir():
@@ -150,11 +202,14 @@ def validate_path():
     """Validate a file/folder path."""
     path_str = request.args.get('path', '')
     path = Path(path_str)
+    # Stat once for existence and once for the kind; a directory is never a file
+    exists = path.exists()
+    is_dir = exists and path.is_dir()
     return jsonify({
-        'exists': path.exists(),
-        'is_dir': path.is_dir() if path.exists() else False,
-        'is_file': path.is_file() if path.exists() else False,
-        'xml_count': count_xml_files(path) if path.is_dir() else 0
+        'exists': exists,
+        'is_dir': is_dir,
+        'is_file': exists and not is_dir and path.is_file(),
+        'xml_count': count_xml_files(path) if is_dir else 0
     })
 
 
@@ -255,17 +310,17 @@ def batch_progress(job_id):
     def generate():
         q = progress_queues.get(job_id)
         if not q:
-            yield f"data: {json.dumps({'type': 'error', 'message': 'Unknown job'})}\n\n"
+            yield _SSE_UNKNOWN_JOB
             return
 
         while True:
             try:
                 msg = q.get(timeout=30)
-                yield f"data: {json.dumps(msg)}\n\n"
+                yield _sse_event(msg)
                 if msg.get('type') == 'complete':
                     break
             except Empty:
-                yield f"data: {json.dumps({'type': 'heartbeat'})}\n\n"
+                yield _SSE_HEARTBEAT
 
     return Response(generate(), mimetype='text/event-stream',
                     headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
@@ -351,14 +406,14 @@ def history_partial():
 @app.route('/partials/file-browser')
 def file_browser_partial():
     """Render file browser partial."""
-    path_str = request.args.get('path', str(Path.home() / 'Desktop'))
+    path_str = request.args.get('path', str(DESKTOP_DIR))
     target = request.args.get('target', '')
     mode = request.args.get('mode', 'folder')  # folder, file
     filter_ext = request.args.get('filter', '')
 
     path = Path(path_str)
     if not path.exists():
-        path = Path.home() / 'Desktop'
+        path = DESKTOP_DIR
 
     items = []
     try:
@@ -389,4 +444,14 @@ def file_browser_partial():
 if __name__ == '__main__':
     print("Starting Plan Express Batch Filler GUI...")
     print("Open http://localhost:5001 in your browser")
-    app.run(debug=True, port=5001, threaded=True)
+    if os.environ.get('DEV'):
+        app.run(debug=True, port=5001, threaded=True)
+    else:
+        # Job progress and results live in this process, so serve with threads
+        # in a single process; waitress is used when installed.
+        try:
+            from waitress import serve
+        except ImportError:
+            app.run(port=5001, threaded=True)
+        else:
+            serve(app, host='127.0.0.1', port=5001, threads=8)
@@ -23,11 +23,16 @@ from __future__ import annotations
 
 import argparse
 import csv
+import sys
 from pathlib import Path
-import xml.etree.ElementTree as ET
-import runpy
 from typing import Dict, List, Optional, Tuple
 
+if __package__:
+    from . import fill_plan_data
+else:
+    # Run as a script: core/ itself is on sys.path
+    import fill_plan_data
+
 
 def main() -> int:
     ap = argparse.ArgumentParser(description='Batch-fill Plan Express CSV with one column per XML file')
@@ -38,101 +43,92 @@ def main() -> int:
     args = ap.parse_args()
 
     # Load functions from fill_plan_data.py
-    mod = runpy.run_path(str(Path(__file__).parent / 'fill_plan_data.py'))
-    parse_map_workbook = mod['parse_map_workbook']
-    read_xlsx_named_sheet_rows = mod['read_xlsx_named_sheet_rows']
-    parse_lov = mod['parse_lov']
-    parse_xml_linknames = mod['parse_xml_linknames']
-    choose_value_for_map_entry = mod['choose_value_for_map_entry']
-    _enforce_yes_no = mod['_enforce_yes_no']
-    fallback_from_lov = mod['fallback_from_lov']
-    pick_from_options_allowed = mod['pick_from_options_allowed']
-    normalize_text = mod['normalize_text']
+    parse_map_workbook = fill_plan_data.parse_map_workbook
+    read_xlsx_named_sheet_rows = fill_plan_data.read_xlsx_named_sheet_rows
+    parse_lov = fill_plan_data.parse_lov
+    read_project_name = fill_plan_data.read_project_name
+    parse_xml_files = fill_plan_data.parse_xml_files
+    choose_value_for_map_entry = fill_plan_data.choose_value_for_map_entry
+    _enforce_yes_no = fill_plan_data._enforce_yes_no
+    _looks_yes_no_prompt = fill_plan_data._looks_yes_no_prompt
+    fallback_from_lov = fill_plan_data.fallback_from_lov
+    pick_from_options_allowed = fill_plan_data.pick_from_options_allowed
+    normalize_text = fill_plan_data.normalize_text
+    list_files = fill_plan_data.list_files
 
     # --- Vesting helpers ---
-    def _is_vesting_schedule_prompt(pt: str) -> bool:
-        p = (pt or '').strip().lower()
-        return ('vesting schedule' in p) and ('describe' not in p)
+    # These take the row's prompt already stripped and lowercased (prompts_lower)
+    def _is_vesting_schedule_prompt(pl: str) -> bool:
+        return ('vesting schedule' in pl) and ('describe' not in pl)
 
-    def _is_apply_schedule_prompt(pt: str) -> bool:
-        p = (pt or '').strip().lower()
-        return p.startswith('which vesting schedule will apply')
+    def _is_apply_schedule_prompt(pl: str) -> bool:
+        return pl.startswith('which vesting schedule will apply')
 
-    def _is_vesting_describe_prompt(pt: str) -> bool:
-        return normalize_text(pt).lower().startswith('please describe your vesting schedule')
+    def _is_vesting_describe_prompt(pl: str) -> bool:
+        return pl.startswith('please describe your vesting schedule')
 
-    def _extract_vesting_other_text(flags: Dict[str, object]) -> Optional[str]:
+    def _extract_vesting_other_text(flags: Dict[str, object], vest_flags: List[Tuple[str, object]]) -> Optional[str]:
         # Preferred holders observed in XMLs
         for k in ('OtherVestProvisions', 'VestOtherMatch'):
-            lf = flags.get(k)
-            if lf is not None:
-                try:
-                    t = (getattr(lf, 'text', None) or '').strip()
-                except Exception:
-                    t = ''
-                if t:
-                    return t
-        # Any Vest*Other* with text
-        for name, lf in flags.items():
-            if ('Vest' in name or 'Vesting' in name) and 'Other' in name:
-                try:
-                    t = (getattr(lf, 'text', None) or '').strip()
-                except Exception:
-                    t = ''
-                if t:
-                    return t
-        # Any Vest* with text as last resort
-        for name, lf in flags.items():
-            if ('Vest' in name or 'Vesting' in name):
-                try:
-                    t = (getattr(lf, 'text', None) or '').strip()
-                except Exception:
-                    t = ''
-                if t:
-                    return t
-        return None
-
-    def _is_immediate_for_money_type(flags: Dict[str, object], quick_text: str) -> bool:
-        qt = (quick_text or '').lower()
-        # Matching: Immediate when NAVestMatch is selected
-        if 'match' in qt:
-            lf = flags.get('NAVestMatch')
-            try:
-                if lf is not None and getattr(lf, 'selected', 0) == 1:
-                    return True
-            except Exception:
-                pass
-        # Matching: explicit 100% match vesting
-        if 'match' in qt:
-            lf = flags.get('Vest100Match')
-            try:
-                if lf is not None and getattr(lf, 'selected', 0) == 1:
-                    return True
-            except Exception:
-                pass
-        # Non-elective / Profit Sharing: treat explicit 100% vesting as Immediate
-        if ('non elective' in qt) or ('non-elective' in qt) or ('profit' in qt):
-            for name in ('100VestingNEContr', 'Vest100NEContr'):
-                lf = flags.get(name)
-                try:
-                    if lf is not None and getattr(lf, 'selected', 0) == 1:
-                        return True
-                except Exception:
-                    pass
-        # Safe Harbor: QACA/Safe Harbor money types are normally fully vested
-        if 'safe harbor' in qt or 'safeharbor' in qt or 'qaca' in qt:
-            lf = flags.get('VestNAQACA')
-            try:
-                if lf is not None and getattr(lf, 'selected', 0) == 1:
-                    return True
-            except Exception:
-                pass
-        # Extend here for Safe Harbor / Profit Sharing immediate identifiers when known
-        return False
+            t = (getattr(flags.get(k), 'text', None) or '').strip()
+            if t:
+                return t
+        # One pass: the first Vest*Other* with text wins, else the first Vest* with text
+        fallback = None
+        for name, lf in vest_flags:
+            t = (getattr(lf, 'text', None) or '').strip()
+            if not t:
+                continue
+            if 'Other' in name:
+                return t
+            if fallback is None:
+                fallback = t
+        return fallback
+
+    # Money-type keywords depend only on the quick text, so classify each one once
+    money_type_kinds: Dict[str, Tuple[bool, bool, bool]] = {}
+
+    def _money_type_kind(quick_text: str) -> Tuple[bool, bool, bool]:
+        kinds = money_type_kinds.get(quick_text)
+        if kinds is None:
+            qt = (quick_text or '').lower()
+            kinds = (
+                'match' in qt,
+                ('non elective' in qt) or ('non-elective' in qt) or ('profit' in qt),
+                'safe harbor' in qt or 'safeharbor' in qt or 'qaca' in qt,
+            )
+            money_type_kinds[quick_text] = kinds
+        return kinds
+
+    def _immediate_vesting_flags(flags: Dict[str, object]) -> Tuple[bool, bool, bool]:
+        # Per-XML immediate-vesting indicators, in _money_type_kind order
+        return (
+            # Matching: NAVestMatch selected, or explicit 100% match vesting
+            getattr(flags.get('NAVestMatch'), 'selected', 0) == 1 or getattr(flags.get('Vest100Match'), 'selected', 0) == 1,
+            # Non-elective / Profit Sharing: treat explicit 100% vesting as Immediate
+            getattr(flags.get('100VestingNEContr'), 'selected', 0) == 1 or getattr(flags.get('Vest100NEContr'), 'selected', 0) == 1,
+            # Safe Harbor: QACA/Safe Harbor money types are normally fully vested
+            getattr(flags.get('VestNAQACA'), 'selected', 0) == 1,
+        )
+
+    def _is_immediate_for_money_type(immediate: Tuple[bool, bool, bool], quick_text: str) -> bool:
+        # immediate is the XML's _immediate_vesting_flags, resolved once per XML
+        is_match, is_ne, is_sh = _money_type_kind(quick_text)
+        imm_match, imm_ne, imm_sh = immediate
+        # Extend _immediate_vesting_flags for Safe Harbor / Profit Sharing identifiers when known
+        return (is_match and imm_match) or (is_ne and imm_ne) or (is_sh and imm_sh)
 
     # --- Gate-aware helpers (for rows like: "If Y in page XXXX seq YY - enter ...") ---
     import re as _re
     _gate_re = _re.compile(r"if\s*y\s*in\s*page\s*(\d+)\s*seq\s*(\d+)", _re.IGNORECASE)
+    _num_re = _re.compile(r"(\d{1,4}(?:[.,]\d{1,2})?)")
+    _page_seq_re = _re.compile(r'page\s+(\d+)\s+seq\s+(\d+)', _re.IGNORECASE)
+    _plan_col_re = _re.compile(r'\[(\w+)\]')
+
+    # Helper: first numeric
+    def first_num(txt: str) -> Optional[str]:
+        m = _num_re.search(txt)
+        return m.group(1) if m else None
 
     def _parse_gate_ref(options_allowed: str) -> Optional[tuple]:
         if not options_allowed:
@@ -142,59 +138,56 @@ def main() -> int:
             return None
         return (m.group(1).strip(), m.group(2).strip())
 
-    def _extract_numeric_for_prompt(prompt: str, flags: Dict[str, object]) -> Optional[str]:
-        p = (prompt or '').lower()
-        # Helper: first numeric
-        def first_num(txt: str) -> Optional[str]:
-            import re
-            m = re.search(r"(\d{1,4}(?:[.,]\d{1,2})?)", txt)
-            return m.group(1) if m else None
-        # Candidate linknames by prompt type
-        candidates: List[str] = []
-        if 'minimum age' in p:
-            candidates += ['InPlanRothDeemedAge']
-        if 'minimum years of participation' in p:
-            candidates += ['InPlanRothDeemedYearsPart', 'InPlanRothDeemedMonthsPart']
-        if 'minimum years of accumulation' in p:
-            candidates += ['InPlanRothDeemedYearsAccum', 'InPlanRothDeemedYearsDistr']
-        if 'minimum amount' in p:
-            candidates += ['InPlanRothOtherProvMinAmnt']
-        if 'maximum number' in p:
-            candidates += ['InPlanRothTransf_LimitsMaxPY', 'IPRT_LimitsMaxPYIRR', 'IPRT_LimitsMaxPYIRT']
+    # Candidate linknames and scan keywords depend only on the prompt, so derive them once
+    numeric_prompt_keys: Dict[str, Tuple[List[str], List[str]]] = {}
+
+    def _numeric_prompt_keys(prompt: str) -> Tuple[List[str], List[str]]:
+        keys = numeric_prompt_keys.get(prompt)
+        if keys is None:
+            p = (prompt or '').lower()
+            candidates: List[str] = []
+            if 'minimum age' in p:
+                candidates += ['InPlanRothDeemedAge']
+            if 'minimum years of participation' in p:
+                candidates += ['InPlanRothDeemedYearsPart', 'InPlanRothDeemedMonthsPart']
+            if 'minimum years of accumulation' in p:
+                candidates += ['InPlanRothDeemedYearsAccum', 'InPlanRothDeemedYearsDistr']
+            if 'minimum amount' in p:
+                candidates += ['InPlanRothOtherProvMinAmnt']
+            if 'maximum number' in p:
+                candidates += ['InPlanRothTransf_LimitsMaxPY', 'IPRT_LimitsMaxPYIRR', 'IPRT_LimitsMaxPYIRT']
+            kws: List[str] = []
+            if 'age' in p:
+                kws.append('age')
+            if 'participation' in p:
+                kws += ['years', 'part']
+            if 'accumulation' in p:
+                kws += ['accum', 'years', 'distr']
+            if 'amount' in p:
+                kws += ['amnt', 'amount', 'min']
+            if 'maximum number' in p:
+                kws += ['max', 'limits', 'py']
+            # Keywords only feed an any() substring test, so drop repeats ('years')
+            keys = (candidates, list(dict.fromkeys(kws)))
+            numeric_prompt_keys[prompt] = keys
+        return keys
+
+    def _extract_numeric_for_prompt(prompt: str, flags: Dict[str, object], roth_flags: List[Tuple[str, object]]) -> Optional[str]:
+        candidates, kws = _numeric_prompt_keys(prompt)
         # Check specific candidates
         for n in candidates:
             lf = flags.get(n)
             if lf is not None:
-                try:
-                    txt = (getattr(lf, 'text', None) or '').strip()
-                except Exception:
-                    txt = ''
+                txt = (getattr(lf, 'text', None) or '').strip()
                 if txt:
                     num = first_num(txt)
                     if num:
                         return num
         # Generic scan for any InPlanRoth* with numeric text and prompt keywords
-        kws = []
-        if 'age' in p:
-            kws.append('age')
-        if 'participation' in p:
-            kws += ['years', 'part']
-        if 'accumulation' in p:
-            kws += ['accum', 'years', 'distr']
-        if 'amount' in p:
-            kws += ['amnt', 'amount', 'min']
-        if 'maximum number' in p:
-            kws += ['max', 'limits', 'py']
-        for name, lf in flags.items():
-            name_l = name.lower()
-            if not name_l.startswith('inplanroth'):
-                continue
+        for name_l, lf in roth_flags:
             if not any(kw in name_l for kw in kws):
                 continue
-            try:
-                txt = (getattr(lf, 'text', None) or '').strip()
-            except Exception:
-                txt = ''
+            txt = (getattr(lf, 'text', None) or '').strip()
             if txt:
                 n = first_num(txt)
                 if n:
@@ -203,12 +196,12 @@ def main() -> int:
 
     # Auto-detect Map and Data Points if not provided
     if not args.map:
-        cands = sorted([p for p in args.input_dir.iterdir() if p.suffix.lower()=='.xlsx' and 'map' in p.name.lower()])
+        cands = sorted([p for p in list_files(args.input_dir, '.xlsx') if 'map' in p.name.lower()])
         if not cands:
             raise SystemExit('Map workbook not provided and no candidates found (name contains "map"). Use --map.')
         args.map = cands[0]
     if not args.datapoints:
-        cands = sorted([p for p in args.input_dir.iterdir() if p.suffix.lower()=='.xlsx' and ('data points' in p.name.lower() or 'tpa' in p.name.lower())])
+        cands = sorted([p for p in list_files(args.input_dir, '.xlsx') if 'data points' in p.name.lower() or 'tpa' in p.name.lower()])
         if not cands:
             raise SystemExit('Data Points workbook not provided and no candidates found (name contains "Data Points" or "TPA"). Use --datapoints.')
         args.datapoints = cands[0]
@@ -233,14 +226,29 @@ def main() -> int:
     lov = parse_lov(args.datapoints)
 
     # Collect XML files
-    xml_files = sorted([p for p in args.input_dir.iterdir() if p.suffix.lower() == '.xml'])
+    xml_files = sorted(list_files(args.input_dir, '.xml'))
     if not xml_files:
         raise SystemExit(f'No XML files found in {args.input_dir}')
 
-    # Pre-parse all XMLs
+    # Pre-parse all XMLs (parsed concurrently on a thread pool)
     xml_flags: Dict[str, Dict[str, object]] = {}
-    for xml in xml_files:
-        xml_flags[xml.stem] = parse_xml_linknames(xml)
+    for xml, flags in zip(xml_files, parse_xml_files(xml_files)):
+        # Stems key every per-XML dict and are looked up per row; intern them once
+        xml_flags[sys.intern(xml.stem)] = flags
+    # InPlanRoth* flags per XML (lowered names) for the generic numeric scan
+    xml_roth_flags: Dict[str, List[Tuple[str, object]]] = {
+        stem: [(name.lower(), lf) for name, lf in flags.items() if name.lower().startswith('inplanroth')]
+        for stem, flags in xml_flags.items()
+    }
+    # Vest* flags per XML, in XML order, for the vesting "Other" description scan
+    xml_vest_flags: Dict[str, List[Tuple[str, object]]] = {
+        stem: [(name, lf) for name, lf in flags.items() if 'Vest' in name]
+        for stem, flags in xml_flags.items()
+    }
+    # Immediate-vesting indicators per XML for the money-type checks
+    xml_immediate: Dict[str, Tuple[bool, bool, bool]] = {
+        stem: _immediate_vesting_flags(flags) for stem, flags in xml_flags.items()
+    }
 
     # Build output header
     # Prefer client ID from XML (LinkName 'ReportingID') as the column label
@@ -255,26 +263,19 @@ def main() -> int:
         rid_flag = flags.get('ReportingID') if isinstance(flags, dict) else None
         rid_text = None
         if rid_flag is not None:
-            try:
-                rid_text = (getattr(rid_flag, 'text', None) or '').strip()
-            except Exception:
-                rid_text = None
+            rid_text = (getattr(rid_flag, 'text', None) or '').strip()
         # Try to get a friendly plan/organization name
         friendly = None
         if isinstance(flags, dict):
             name_flag = flags.get('1stAdoptERName')
             if name_flag is not None:
-                try:
-                    friendly = (getattr(name_flag, 'text', None) or '').strip()
-                except Exception:
-                    friendly = None
+                friendly = (getattr(name_flag, 'text', None) or '').strip()
         if not friendly:
             # As a fallback, read <ProjectName> from the XML
             try:
-                root = ET.parse(xml).getroot()
-                pn = root.find('.//ProjectName')
-                if pn is not None and pn.text:
-                    friendly = pn.text.strip()
+                pn_text = read_project_name(xml)
+                if pn_text:
+                    friendly = pn_text.strip()
             except Exception:
                 friendly = None
         # Compose the header label with both friendly name and client id if available
@@ -299,196 +300,240 @@ def main() -> int:
 
     # Optional: load the "Manually done" CSV for ground-truth overlay per cell
     manual_path = args.input_dir / 'TPA Data Points_PE_Module_FeeUI - Completed- with plan names (Manually done).csv'
-    manual_rows: List[List[str]] = []
     manual_idx: Dict[str, int] = {}
     manual_key_to_row: Dict[Tuple[str, str, str], List[str]] = {}
     manual_plan_cols: Dict[str, int] = {}
     if manual_path.exists():
         try:
+            # Index rows straight off the reader; only the keyed rows are kept
             with manual_path.open(encoding='utf-8-sig') as f:
                 reader = csv.reader(f)
-                manual_rows = list(reader)
-            if manual_rows:
-                mh = manual_rows[0]
-                # Helper to locate headers by prefix match
-                def _midx(name: str) -> int:
+                mh = next(reader, None)
+                if mh is not None:
+                    # Helper to locate headers by prefix match; headers are stripped once
+                    mh_stripped = [(h or '').strip() for h in mh]
+                    def _midx(name: str) -> int:
+                        for i, h in enumerate(mh_stripped):
+                            if h.startswith(name):
+                                return i
+                        return -1
+                    mi_page = _midx('Page')
+                    mi_seq = _midx('Seq')
+                    mi_prompt = _midx('PROMPT')
+                    # Map plan id -> column index
                     for i, h in enumerate(mh):
-                        if (h or '').strip().startswith(name):
-                            return i
-                    return -1
-                mi_page = _midx('Page')
-                mi_seq = _midx('Seq')
-                mi_prompt = _midx('PROMPT')
-                # Map plan id -> column index
-                import re as _re
-                for i, h in enumerate(mh):
-                    m = _re.search(r'\[(\w+)\]', h or '')
-                    if m:
-                        manual_plan_cols[m.group(1)] = i
-                # Build key index (Page, Seq, Prompt) -> row
-                for r in manual_rows[1:]:
-                    key = ((r[mi_page] if 0 <= mi_page < len(r) else '').strip(),
-                           (r[mi_seq] if 0 <= mi_seq < len(r) else '').strip(),
-                           (normalize_text(r[mi_prompt]) if 0 <= mi_prompt < len(r) else ''))
-                    manual_key_to_row[key] = r
+                        m = _plan_col_re.search(h or '')
+                        if m:
+                            manual_plan_cols[m.group(1)] = i
+                    # Build key index (Page, Seq, Prompt) -> row
+                    for r in reader:
+                        key = ((r[mi_page] if 0 <= mi_page < len(r) else '').strip(),
+                               (r[mi_seq] if 0 <= mi_seq < len(r) else '').strip(),
+                               (normalize_text(r[mi_prompt]) if 0 <= mi_prompt < len(r) else ''))
+                        manual_key_to_row[key] = r
         except Exception:
             # If manual cannot be parsed, continue silently without overlay
-            manual_rows = []
+            manual_key_to_row.clear()
+            manual_plan_cols.clear()
 
     # Match the "Manually done" layout: include Quick Text Data Point and a trailing Comments column
     out_header = ['Page', 'Seq', 'PROMPT', 'Quick Text Data Point', 'Options Allowed'] + column_labels + ['Comments']
     out_rows: List[List[str]] = [out_header]
-    # Add PensionPal ID row matching manual layout
-    out_rows.append(['n/a', 'n/a', 'PensionPal ID', 'PensionPal ID', ''] + rids_for_cols + [''])
-
-    # Inject a metadata row similar to manual: PensionPal ID with IDs per plan
-    out_rows: List[List[str]] = [out_header]
 
     # Track previous vesting choice per (page, xml) to support filling "Other" description rows
     prior_vesting_choice: Dict[tuple, str] = {}
     prior_base_vest_choice: Dict[tuple, str] = {}
     prior_base_vest_quick: Dict[tuple, str] = {}
 
-    # Pre-pass: cache base vesting selections across all pages for quick lookup
-    for r in rows[1:]:
+    # (stem, flags) per XML column, resolved once; Path.stem is recomputed on each access
+    xml_cols = [(sys.intern(xml.stem), xml_flags[xml.stem]) for xml in xml_files]
+    dedup_cols = [(sys.intern(xml.stem), xml_flags[xml.stem]) for xml in xmls_dedup]
+
+    # Read each template row's cells and map entry once, as parallel lists
+    # indexed by row; the passes below all reuse them
+    prompts_norm: List[str] = []
+    prompts_lower: List[str] = []
+    row_options: List[str] = []
+    row_pages: List[str] = []
+    row_seqs: List[str] = []
+    row_entries: List[Optional[Dict[str, object]]] = []
+    row_quick: List[str] = []  # map Quick Text per row ('' without an entry)
+    for r in rows:
         prompt = normalize_text(r[i_prompt] if 0 <= i_prompt < len(r) else '')
-        if not _is_vesting_schedule_prompt(prompt) or _is_apply_schedule_prompt(prompt) or _is_vesting_describe_prompt(prompt):
+        prompts_norm.append(prompt)
+        prompts_lower.append(prompt.strip().lower())
+        row_options.append((r[i_options] if (0 <= i_options < len(r)) else '').strip())
+        row_pages.append((r[i_page] if (0 <= i_page < len(r)) else '').strip())
+        row_seqs.append((r[i_seq] if (0 <= i_seq < len(r)) else '').strip())
+        me = map_data.get(prompt) if prompt else None
+        row_entries.append(me)
+        row_quick.append(str(me.get('quick') or '') if me else '')
+
+    # Pre-pass: cache base vesting selections across all pages for quick lookup
+    for row_idx in range(1, len(rows)):
+        prompt = prompts_norm[row_idx]
+        pnorm = prompts_lower[row_idx]
+        if not _is_vesting_schedule_prompt(pnorm) or _is_apply_schedule_prompt(pnorm) or _is_vesting_describe_prompt(pnorm):
             continue
-        options = (r[i_options] if (0 <= i_options < len(r)) else '').strip()
-        page = (r[i_page] if (0 <= i_page < len(r)) else '').strip()
+        options = row_options[row_idx]
+        page = row_pages[row_idx]
         # Skip any template-provided meta row duplicating our injected PensionPal ID
-        pnorm = (prompt or '').lower()
         if 'pensionpal id' in pnorm:
             continue
-        me = map_data.get(prompt) if prompt else None
-        for xml in xml_files:
-            flags = xml_flags[xml.stem]
+        me = row_entries[row_idx]
+        # Fallbacks depend only on the row, so resolve them once for all XMLs
+        seq = row_seqs[row_idx]
+        row_lov = fallback_from_lov(page, seq, options, lov)
+        row_pick = pick_from_options_allowed(options)
+        # Y/N enforcement only applies to Y/N prompts; decide that once per row
+        row_yes_no = bool(me) and _looks_yes_no_prompt(prompt, options)
+        for stem, flags in xml_cols:
             val: Optional[str] = None
             if me:
                 val = choose_value_for_map_entry(me, options, flags, prompt)
-                val = _enforce_yes_no(prompt, options, val, flags, me, True)
+                if row_yes_no:
+                    val = _enforce_yes_no(prompt, options, val, flags, me, True)
             if val is None:
-                # We need seq for LOV fallback
-                seq = (r[i_seq] if (0 <= i_seq < len(r)) else '').strip()
-                val = fallback_from_lov(page, seq, options, lov)
-            if val is None:
-                pick = pick_from_options_allowed(options)
-                if pick:
-                    val = pick
+                val = row_lov
+            if val is None and row_pick:
+                val = row_pick
             choice = (val or '').strip()
             # If schedule shows Other but immediate identifier is present for this money type, coerce to Immediate
-            me_quick = (me.get('quick') if isinstance(me, dict) else '') or ''
-            if choice.lower() == 'other' and _is_immediate_for_money_type(flags, me_quick):
+            me_quick = row_quick[row_idx]
+            if choice.lower() == 'other' and _is_immediate_for_money_type(xml_immediate[stem], me_quick):
                 choice = 'Immediate'
-            prior_base_vest_choice[(page, xml.stem)] = choice
-            prior_base_vest_quick[(page, xml.stem)] = me_quick
+            prior_base_vest_choice[(page, stem)] = choice
+            prior_base_vest_quick[(page, stem)] = me_quick
 
     # Iterate template rows and fill per XML (using de-duplicated list)
     filled_values: Dict[tuple, str] = {}
+    # Gate-aware numeric per (prompt, XML); each XML's flags are fixed for the
+    # run, so repeated prompts reuse the first scan
+    gate_numbers: Dict[Tuple[str, str], Optional[str]] = {}
     # Track per-page eligibility computation method to support downstream prompts
     elig_method_by_page: Dict[tuple, str] = {}
+    # Page of the nearest preceding base vesting schedule row for each template row,
+    # computed once instead of scanning backwards per row and XML
+    prev_vest_page: List[Optional[str]] = [None] * len(rows)
+    last_vest_page: Optional[str] = None
+    for k in range(1, len(rows)):
+        prev_vest_page[k] = last_vest_page
+        pr_k = prompts_lower[k]
+        if _is_vesting_schedule_prompt(pr_k) and not _is_apply_schedule_prompt(pr_k):
+            last_vest_page = row_pages[k]
+
     for row_idx in range(1, len(rows)):
-        r = rows[row_idx]
-        prompt = normalize_text(r[i_prompt] if 0 <= i_prompt < len(r) else '')
-        options = (r[i_options] if (0 <= i_options < len(r)) else '').strip()
-        page = (r[i_page] if (0 <= i_page < len(r)) else '').strip()
-        seq = (r[i_seq] if (0 <= i_seq < len(r)) else '').strip()
+        prompt = prompts_norm[row_idx]
+        options = row_options[row_idx]
+        page = row_pages[row_idx]
+        seq = row_seqs[row_idx]
 
-        me = map_data.get(prompt) if prompt else None
+        me = row_entries[row_idx]
 
         # Quick Text Data Point from mapping (if available)
-        quick_text = ''
-        if me and isinstance(me, dict):
-            quick_text = str(me.get('quick') or '')
+        quick_text = row_quick[row_idx]
 
         row_out = [page, seq, prompt, quick_text, options]
-        for col_idx, xml in enumerate(xmls_dedup):
-            flags = xml_flags[xml.stem]
+        # Row-invariant fallbacks and gate reference, shared by every XML column
+        row_lov = fallback_from_lov(page, seq, options, lov)
+        row_pick = pick_from_options_allowed(options)
+        gate_ref = _parse_gate_ref(options)
+        row_yes_no = bool(me) and _looks_yes_no_prompt(prompt, options)
+        # Classify the prompt once per row; every XML column reuses it
+        pnorm = prompts_lower[row_idx]
+        is_vest_schedule = _is_vesting_schedule_prompt(pnorm)
+        is_apply_schedule = _is_apply_schedule_prompt(pnorm)
+        is_vest_describe = _is_vesting_describe_prompt(pnorm)
+
+        # No map entry, LOV or Options Allowed value, and no gate, vesting,
+        # eligibility or manual rule applies: every XML column is blank
+        if (not me and row_lov is None and not row_pick and gate_ref is None
+                and not is_vest_schedule and not is_vest_describe
+                and 'eligibility computation method' not in pnorm
+                and not (manual_key_to_row and rids_for_cols and (page, seq, prompt) in manual_key_to_row)):
+            for stem, _flags in dedup_cols:
+                filled_values[(page, seq, stem)] = ''
+            row_out.extend([''] * len(dedup_cols))
+            row_out.append('')
+            out_rows.append(row_out)
+            continue
+
+        for col_idx, (stem, flags) in enumerate(dedup_cols):
             val: Optional[str] = None
             source: str = 'none'
             if me:
                 val_from_map = choose_value_for_map_entry(me, options, flags, prompt)
-                val = _enforce_yes_no(prompt, options, val_from_map, flags, me, True)
+                val = (_enforce_yes_no(prompt, options, val_from_map, flags, me, True)
+                       if row_yes_no else val_from_map)
                 if val is not None:
                     source = 'strict'
             # Deterministic fallbacks: LOV then Options Allowed first line
-            if val is None:
-                v2 = fallback_from_lov(page, seq, options, lov)
-                if v2 is not None:
-                    val = v2
-                    source = 'lov'
-            if val is None:
-                pick = pick_from_options_allowed(options)
-                if pick:
-                    val = pick
-                    source = 'options'
+            if val is None and row_lov is not None:
+                val = row_lov
+                source = 'lov'
+            if val is None and row_pick:
+                val = row_pick
+                source = 'options'
             # Gate-aware numeric extraction: if this row depends on a Yes gate and value is empty, try pulling a numeric from XML
-            gate_ref = _parse_gate_ref(options)
             if gate_ref is not None:
                 g_page, g_seq = gate_ref
-                gate = filled_values.get((g_page, g_seq, xml.stem), '').strip().lower()
+                gate = filled_values.get((g_page, g_seq, stem), '').strip().lower()
                 if gate == 'yes' and (not val or val.strip().lower().startswith('if y')):
-                    num = _extract_numeric_for_prompt(prompt, flags)
+                    num_key = (prompt, stem)
+                    if num_key in gate_numbers:
+                        num = gate_numbers[num_key]
+                    else:
+                        num = gate_numbers[num_key] = _extract_numeric_for_prompt(prompt, flags, xml_roth_flags[stem])
                     if num is not None:
                         val = num
                         if source != 'strict':
                             source = 'xml_infer'
             # Vesting-specific logic: capture schedule choice and fill description when 'Other'
-            if _is_vesting_schedule_prompt(prompt):
+            if is_vest_schedule:
                 # If schedule says Other but we can infer Immediate, coerce it
-                me_quick = (me.get('quick') if isinstance(me, dict) else '') or ''
+                me_quick = row_quick[row_idx]
                 choice = (val or '').strip()
-                if choice.lower() == 'other' and _is_immediate_for_money_type(flags, me_quick):
+                if choice.lower() == 'other' and _is_immediate_for_money_type(xml_immediate[stem], me_quick):
                     choice = 'Immediate'
                     if source != 'strict':
                         source = 'xml_infer'
                     val = choice or val
-                prior_vesting_choice[(page, xml.stem)] = choice
-                if not _is_apply_schedule_prompt(prompt):
-                    prior_base_vest_choice[(page, xml.stem)] = choice
-                    prior_base_vest_quick[(page, xml.stem)] = me_quick
-            elif _is_vesting_describe_prompt(prompt):
-                prev = prior_vesting_choice.get((page, xml.stem), '').strip().lower()
+                prior_vesting_choice[(page, stem)] = choice
+                if not is_apply_schedule:
+                    prior_base_vest_choice[(page, stem)] = choice
+                    prior_base_vest_quick[(page, stem)] = me_quick
+            elif is_vest_describe:
+                prev = prior_vesting_choice.get((page, stem), '').strip().lower()
                 if prev == 'other' or prev.startswith('other '):
-                    txt = _extract_vesting_other_text(flags)
+                    txt = _extract_vesting_other_text(flags, xml_vest_flags[stem])
                     if txt is not None and txt != '':
                         val = txt
                     else:
                         # Fallbacks guided by map quick text (e.g., "If 'Other' is selected in page 6050 seq 10")
                         ref_page = None
-                        try:
-                            me_quick = (me.get('quick') if isinstance(me, dict) else '') or ''
-                            import re as _re
-                            m = _re.search(r'page\s+(\d+)\s+seq\s+(\d+)', me_quick, _re.IGNORECASE)
-                            if m:
-                                ref_page = m.group(1).strip()
-                        except Exception:
-                            ref_page = None
+                        me_quick = row_quick[row_idx]
+                        m = _page_seq_re.search(me_quick)
+                        if m:
+                            ref_page = m.group(1).strip()
                         base = ''
                         if ref_page:
-                            base = prior_base_vest_choice.get((ref_page, xml.stem), '').strip()
+                            base = prior_base_vest_choice.get((ref_page, stem), '').strip()
                         if not base:
-                            base = prior_base_vest_choice.get((page, xml.stem), '').strip()
+                            base = prior_base_vest_choice.get((page, stem), '').strip()
                         # Additional inference: if base/quick indicate match and NAVestMatch is selected, write Immediate
                         if (not base or base.lower() == 'other'):
-                            q = prior_base_vest_quick.get((page, xml.stem), '')
-                            if _is_immediate_for_money_type(flags, q):
+                            q = prior_base_vest_quick.get((page, stem), '')
+                            if _is_immediate_for_money_type(xml_immediate[stem], q):
                                 base = 'Immediate'
                         if not base:
-                            # Last resort: scan backward to nearest prior vesting schedule row and use its page
-                            k = row_idx - 1
-                            while k >= 1 and not base:
-                                r_prev = rows[k]
-                                pr_prev = normalize_text(r_prev[i_prompt] if 0 <= i_prompt < len(r_prev) else '')
-                                if _is_vesting_schedule_prompt(pr_prev) and not _is_apply_schedule_prompt(pr_prev):
-                                    prev_page = (r_prev[i_page] if (0 <= i_page < len(r_prev)) else '').strip()
-                                    base = prior_base_vest_choice.get((prev_page, xml.stem), '').strip()
-                                    if not base or base.lower() == 'other':
-                                        q = prior_base_vest_quick.get((prev_page, xml.stem), '')
-                                        if _is_immediate_for_money_type(flags, q):
-                                            base = 'Immediate'
-                                    break
-                                k -= 1
+                            # Last resort: use the page of the nearest prior vesting schedule row
+                            prev_page = prev_vest_page[row_idx]
+                            if prev_page is not None:
+                                base = prior_base_vest_choice.get((prev_page, stem), '').strip()
+                                if not base or base.lower() == 'other':
+                                    q = prior_base_vest_quick.get((prev_page, stem), '')
+                                    if _is_immediate_for_money_type(xml_immediate[stem], q):
+                                        base = 'Immediate'
                         val = base
                         if source != 'strict' and base:
                             source = 'xml_infer'
@@ -496,16 +541,12 @@ def main() -> int:
                     # If previous choice was not Other, description should remain blank
                     val = ''
             # Capture eligibility computation method per page to inform related numeric prompts
-            try:
-                pnorm = (prompt or '').strip().lower()
-            except Exception:
-                pnorm = ''
             if 'eligibility computation method' in pnorm:
-                elig_method_by_page[(page, xml.stem)] = (val or '').strip()
+                elig_method_by_page[(page, stem)] = (val or '').strip()
             # If the downstream prompt asks for minimum service hours for eligibility and the method is Elapsed Time,
             # prefer the explicit label 'Elapsed' rather than a numeric hours value.
             if ('minimum service hours required to become eligible' in pnorm) and (val or '').strip():
-                meth = elig_method_by_page.get((page, xml.stem), '')
+                meth = elig_method_by_page.get((page, stem), '')
                 if isinstance(meth, str) and ('elapsed' in meth.lower()):
                     val = 'Elapsed'
             # If a manual CSV exists, overlay the ground-truth value per plan id
@@ -520,7 +561,7 @@ def main() -> int:
                         val = man_val
                         source = 'manual'
             # Record the final filled value for gate checks on later rows
-            filled_values[(page, seq, xml.stem)] = (val or '').strip()
+            filled_values[(page, seq, stem)] = (val or '').strip()
             # Append final value without markers
             row_out.append(val or '')
 
@@ -533,10 +574,8 @@ def main() -> int:
     if not out_csv:
         out_csv = args.input_dir / 'plan_express_filled_batch.csv'
     out_csv.parent.mkdir(parents=True, exist_ok=True)
-    with out_csv.open('w', newline='', encoding='utf-8') as f:
-        w = csv.writer(f)
-        for r in out_rows:
-            w.writerow(r)
+    with out_csv.open('w', newline='', encoding='utf-8', buffering=1 << 20) as f:
+        csv.writer(f).writerows(out_rows)
     print(f'Wrote {out_csv} with {len(xmls_dedup)} XML columns and {len(out_rows)-1} template rows.')
     return 0
 
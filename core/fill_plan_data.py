@@ -34,23 +34,40 @@ Notes:
 from __future__ import annotations
 
 import argparse
+import copy
 import csv
+import os
 import re
+import shutil
 import sys
 import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
+from functools import lru_cache
+from itertools import islice
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, Iterator, List, Optional, Tuple
 from zipfile import ZipFile, ZipInfo
 
 
-@dataclass
+@dataclass(slots=True)
 class LinkNameFlag:
     selected: int
     insert: int
+    # Always a stripped, non-empty str or None, so reading it cannot raise
     text: Optional[str] = None
 
 
+def list_files(input_dir: Path, suffix: str) -> List[Path]:
+    """List regular files in input_dir whose extension matches suffix (case-insensitive)."""
+    with os.scandir(input_dir) as it:
+        return [Path(e.path) for e in it if e.is_file() and os.path.splitext(e.name)[1].lower() == suffix]
+
+
+# selected/insert are almost always '0' or '1'; skip int() for those
+_FAST_INT = {'0': 0, '1': 1}
+
+
 def parse_xml_linknames(xml_path: Path) -> Dict[str, LinkNameFlag]:
     """Parse XML to a map of linkname-like flags.
 
@@ -58,27 +75,36 @@ def parse_xml_linknames(xml_path: Path) -> Dict[str, LinkNameFlag]:
     - <LinkName value="..." selected="0/1" insert="0/1">text</LinkName>
     - <PlanData FieldName="...">text?</PlanData> (presence implies selection)
     """
-    tree = ET.parse(xml_path)
-    root = tree.getroot()
     link_flags: Dict[str, LinkNameFlag] = {}
-    # Classic LinkName flags
-    for ln in root.findall('.//LinkName'):
-        name = (ln.get('value') or '').strip()
-        if not name:
-            continue
-        sel = ln.get('selected') or '0'
-        ins = ln.get('insert') or '0'
-        txt = (ln.text or '').strip() if ln.text else None
-        try:
-            link_flags[name] = LinkNameFlag(selected=int(sel), insert=int(ins), text=txt if txt else None)
-        except ValueError:
-            link_flags[name] = LinkNameFlag(selected=0, insert=0, text=txt if txt else None)
+    plan_data: List[Tuple[str, Optional[str]]] = []
+    # Stream the document and clear every element once it ends (children end
+    # before their parents), so the tree never holds the full answer set.
+    for _, el in ET.iterparse(xml_path):
+        tag = el.tag
+        if tag == 'LinkName':
+            # Classic LinkName flags; names are interned since every XML and the
+            # map repeat the same few hundred linknames
+            name = sys.intern((el.get('value') or '').strip())
+            if name:
+                sel_raw = el.get('selected') or '0'
+                ins_raw = el.get('insert') or '0'
+                txt = (el.text or '').strip() if el.text else None
+                sel = _FAST_INT.get(sel_raw)
+                ins = _FAST_INT.get(ins_raw)
+                if sel is None or ins is None:
+                    try:
+                        sel, ins = int(sel_raw), int(ins_raw)
+                    except ValueError:
+                        sel, ins = 0, 0
+                link_flags[name] = LinkNameFlag(selected=sel, insert=ins, text=txt if txt else None)
+        elif tag == 'PlanData':
+            name = sys.intern((el.get('FieldName') or '').strip())
+            if name:
+                plan_data.append((name, (el.text or '').strip() if el.text else None))
+        el.clear()
     # PlanData FieldName flags (treat presence as selected; text when present)
-    for pd in root.findall('.//PlanData'):
-        name = (pd.get('FieldName') or '').strip()
-        if not name:
-            continue
-        txt = (pd.text or '').strip() if pd.text else None
+    # Applied after all LinkName entries, which take precedence
+    for name, txt in plan_data:
         # If already populated via LinkName, prefer LinkName entry
         if name in link_flags:
             # But backfill text when LinkName had none
@@ -90,6 +116,55 @@ def parse_xml_linknames(xml_path: Path) -> Dict[str, LinkNameFlag]:
     return link_flags
 
 
+@lru_cache(maxsize=256)
+def _parse_xml_file_cached(path: str, mtime_ns: int, size: int) -> Dict[str, LinkNameFlag]:
+    return parse_xml_linknames(Path(path))
+
+
+def _parse_xml_file(path: Path) -> Dict[str, LinkNameFlag]:
+    st = path.stat()
+    return _parse_xml_file_cached(str(path), st.st_mtime_ns, st.st_size)
+
+
+def parse_xml_files(paths: List[Path], max_workers: int = 16) -> Iterator[Dict[str, LinkNameFlag]]:
+    """Parse several XML exports on a thread pool, yielding flag maps in input order.
+
+    Results are cached per file by (path, mtime, size), so re-running a batch
+    over unchanged XMLs skips the parse; treat the maps as read-only.
+    """
+    if len(paths) <= 1:
+        yield from (_parse_xml_file(p) for p in paths)
+        return
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(paths))) as ex:
+        yield from ex.map(_parse_xml_file, paths)
+
+
+def _scan_project_name(source: str) -> Optional[str]:
+    target = None
+    for event, el in ET.iterparse(source, events=('start', 'end')):
+        if event == 'start':
+            if target is None and el.tag == 'ProjectName':
+                target = el
+        elif el is target:
+            return el.text
+    return None
+
+
+@lru_cache(maxsize=4096)
+def _project_name_for_file(path: str, mtime_ns: int, size: int) -> Optional[str]:
+    return _scan_project_name(path)
+
+
+def read_project_name(xml_path: Path) -> Optional[str]:
+    """Return the text of the first <ProjectName>, parsing only as far as needed.
+
+    Results are cached by (path, mtime, size), so re-running a batch over the
+    same folder does not re-read unchanged XMLs.
+    """
+    st = xml_path.stat()
+    return _project_name_for_file(str(xml_path), st.st_mtime_ns, st.st_size)
+
+
 def _xlsx_shared_strings(z: ZipFile) -> List[str]:
     strings: List[str] = []
     try:
@@ -132,20 +207,23 @@ def _xlsx_sheet_targets(z: ZipFile) -> List[Tuple[str, str]]:
     return sheets
 
 
-def read_xlsx_first_sheet_rows(xlsx_path: Path) -> List[List[str]]:
-    with ZipFile(xlsx_path) as z:
-        strings = _xlsx_shared_strings(z)
-        # Assume first sheet
-        first_sheet = 'xl/worksheets/sheet1.xml'
-        with z.open(first_sheet) as f:
-            sh = ET.parse(f).getroot()
-        ns = {'s': 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'}
-        rows_out: List[List[str]] = []
-        for row in sh.findall('.//{http://schemas.openxmlformats.org/spreadsheetml/2006/main}row'):
+_ROW_TAG = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}row'
+_CELL_TAG = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}c'
+_VALUE_TAG = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}v'
+
+
+def _xlsx_sheet_rows(z: ZipFile, member: str, strings: List[str]) -> List[List[str]]:
+    # Stream the worksheet row by row and clear each row once read, so large
+    # sheets never sit in memory as a full element tree.
+    rows_out: List[List[str]] = []
+    with z.open(member) as f:
+        for _, row in ET.iterparse(f):
+            if row.tag != _ROW_TAG:
+                continue
             vals: List[str] = []
-            for c in row.findall('{http://schemas.openxmlformats.org/spreadsheetml/2006/main}c'):
+            for c in row.iterfind(_CELL_TAG):
                 t = c.get('t')
-                v = c.find('{http://schemas.openxmlformats.org/spreadsheetml/2006/main}v')
+                v = c.find(_VALUE_TAG)
                 if v is None:
                     vals.append('')
                 elif t == 's':
@@ -156,10 +234,35 @@ def read_xlsx_first_sheet_rows(xlsx_path: Path) -> List[List[str]]:
                 else:
                     vals.append(v.text or '')
             rows_out.append(vals)
-        return rows_out
+            row.clear()
+    return rows_out
+
+
+def read_xlsx_first_sheet_rows(xlsx_path: Path) -> List[List[str]]:
+    with ZipFile(xlsx_path) as z:
+        strings = _xlsx_shared_strings(z)
+        # Assume first sheet
+        first_sheet = 'xl/worksheets/sheet1.xml'
+        return _xlsx_sheet_rows(z, first_sheet, strings)
 
 
 def read_xlsx_named_sheet_rows(xlsx_path: Path, sheet_name: str) -> List[List[str]]:
+    """Return the rows of a named sheet.
+
+    Parsed sheets are cached per file and reused until its mtime or size
+    changes; each call gets fresh row lists, so callers may modify them.
+    """
+    st = Path(xlsx_path).stat()
+    cached = _read_xlsx_named_sheet_rows_cached(str(xlsx_path), st.st_mtime_ns, st.st_size, sheet_name)
+    return [list(r) for r in cached]
+
+
+@lru_cache(maxsize=8)
+def _read_xlsx_named_sheet_rows_cached(path: str, mtime_ns: int, size: int, sheet_name: str) -> Tuple[Tuple[str, ...], ...]:
+    return tuple(tuple(r) for r in _read_xlsx_named_sheet_rows(Path(path), sheet_name))
+
+
+def _read_xlsx_named_sheet_rows(xlsx_path: Path, sheet_name: str) -> List[List[str]]:
     with ZipFile(xlsx_path) as z:
         strings = _xlsx_shared_strings(z)
         targets = _xlsx_sheet_targets(z)
@@ -170,29 +273,22 @@ def read_xlsx_named_sheet_rows(xlsx_path: Path, sheet_name: str) -> List[List[st
                 break
         if not target_path:
             raise RuntimeError(f'Sheet {sheet_name!r} not found in {xlsx_path}')
-        with z.open(target_path) as f:
-            sh = ET.parse(f).getroot()
-        rows_out: List[List[str]] = []
-        for row in sh.findall('.//{http://schemas.openxmlformats.org/spreadsheetml/2006/main}row'):
-            vals: List[str] = []
-            for c in row.findall('{http://schemas.openxmlformats.org/spreadsheetml/2006/main}c'):
-                t = c.get('t')
-                v = c.find('{http://schemas.openxmlformats.org/spreadsheetml/2006/main}v')
-                if v is None:
-                    vals.append('')
-                elif t == 's':
-                    try:
-                        vals.append(strings[int(v.text)])
-                    except Exception:
-                        vals.append('')
-                else:
-                    vals.append(v.text or '')
-            rows_out.append(vals)
-        return rows_out
+        return _xlsx_sheet_rows(z, target_path, strings)
+
 
+# Token helpers for matching option lines against linkname keywords
+_NON_ALNUM_RE = re.compile(r'[^a-z0-9]+')
+_DIGITS_RE = re.compile(r'\d+')
+# First run of up to three digits in a free-text service requirement, e.g. 'Sixty Days (60)'
+_SERVICE_NUM_RE = re.compile(r'(\d{1,3})')
 
+
+@lru_cache(maxsize=4096)
 def normalize_text(s: str) -> str:
-    return re.sub(r"\s+", " ", (s or '').strip()).rstrip(':')
+    # str.split() collapses the same whitespace set as \s+ without the regex engine.
+    # Interned so template prompts and map keys are the same object, letting
+    # map_data.get(prompt) match on identity instead of comparing long strings.
+    return sys.intern(' '.join((s or '').split()).rstrip(':'))
 
 
 def parse_map_workbook(map_xlsx: Path) -> Dict[str, Dict[str, object]]:
@@ -206,14 +302,24 @@ def parse_map_workbook(map_xlsx: Path) -> Dict[str, Dict[str, object]]:
            {'quick': str, 'label': str|None, 'linknames': [str,...]},
         ]
       }
+
+    The parsed map is cached per file and reused until its mtime or size
+    changes, so callers must treat the result as read-only.
     """
+    st = Path(map_xlsx).stat()
+    return _parse_map_workbook_cached(str(map_xlsx), st.st_mtime_ns, st.st_size)
+
+
+@lru_cache(maxsize=8)
+def _parse_map_workbook_cached(path: str, mtime_ns: int, size: int) -> Dict[str, Dict[str, object]]:
+    return _parse_map_workbook(Path(path))
+
+
+def _parse_map_workbook(map_xlsx: Path) -> Dict[str, Dict[str, object]]:
     # Allow CSV maps for auto-derived mappings
     if str(map_xlsx).lower().endswith('.csv'):
-        import csv as _csv
-        rows: List[List[str]] = []
         with map_xlsx.open(encoding='utf-8') as f:
-            for r in _csv.reader(f):
-                rows.append(r)
+            rows: List[List[str]] = list(csv.reader(f))
     else:
         rows = read_xlsx_first_sheet_rows(map_xlsx)
     if not rows:
@@ -241,7 +347,7 @@ def parse_map_workbook(map_xlsx: Path) -> Dict[str, Dict[str, object]]:
             return first_line or None
         return None
 
-    for r in rows[1:]:
+    for r in islice(rows, 1, None):
         if not any((x or '').strip() for x in r):
             continue
         prompt_cell = r[i_prompt] if i_prompt < len(r) else ''
@@ -260,120 +366,235 @@ def parse_map_workbook(map_xlsx: Path) -> Dict[str, Dict[str, object]]:
         if quick and not entry['quick']:
             entry['quick'] = quick
         if linkcsv:
-            names = [n.strip() for n in linkcsv.split(',') if n.strip()]
+            # Interned like the XML flag keys, so lookups match on identity
+            names = [sys.intern(n.strip()) for n in linkcsv.split(',') if n.strip()]
             entry['options'].append({'quick': quick, 'label': extract_label(quick), 'linknames': names})
     return mapping
 
-def choose_value_for_map_entry(map_entry: Dict[str, object], options_allowed: str, link_flags: Dict[str, LinkNameFlag], prompt_text: str) -> Optional[str]:
-    # Vesting schedule mapping: infer canonical labels (Immediate, 1-25, 1-20, 2-20, Cliff2)
-    def _is_vesting_schedule_prompt(pt: str) -> bool:
-        p = (pt or '').strip().lower()
-        return ('vesting schedule' in p) and ('describe' not in p)
-
-    def _derive_vesting_label(flags: Dict[str, LinkNameFlag], quick_text: str) -> Optional[str]:
-        """Map a wide set of vesting indicators to canonical labels.
-
-        Supports Match, Non-Elective/Profit Sharing, and Safe Harbor/QACA.
-        """
-        # Graded schedules (map known flags to canonical labels used in template/LOV)
-        graded_map = {
-            # Match money type graded schedules
-            'Vest6YRGradeMatch': '2-20',  # 0,0,20,40,60,80,100
-            'Vest5YRGradeMatch': '1-20',  # 0,20,40,60,80,100
-            'Vest4YRGradeMatch': '1-25',  # 0,25,50,75,100
-            # Non-elective/profit sharing graded schedules (PlanData FieldName variants)
-            '6YRGradedNEContr': '2-20',
-            '5YRGradedNEContr': '1-20',
-            '4YRGradedNEContr': '1-25',
-        }
-        for nm, label in graded_map.items():
-            lf = flags.get(nm)
-            if lf and lf.selected == 1:
-                return label
-        # Cliff schedules
-        cliff_map = {
-            'Vest3YRClifMatch': 'Cliff 3',
-            '3YRCliffNEContr': 'Cliff 3',
-            '2YRCliffNEContr': 'Cliff 2',
-        }
-        for nm, label in cliff_map.items():
+
+# Vesting schedule flags -> canonical labels used in template/LOV, checked in order.
+_GRADED_VESTING_FLAGS: Tuple[Tuple[str, str], ...] = (
+    # Match money type graded schedules
+    ('Vest6YRGradeMatch', '2-20'),  # 0,0,20,40,60,80,100
+    ('Vest5YRGradeMatch', '1-20'),  # 0,20,40,60,80,100
+    ('Vest4YRGradeMatch', '1-25'),  # 0,25,50,75,100
+    # Non-elective/profit sharing graded schedules (PlanData FieldName variants)
+    ('6YRGradedNEContr', '2-20'),
+    ('5YRGradedNEContr', '1-20'),
+    ('4YRGradedNEContr', '1-25'),
+)
+_CLIFF_VESTING_FLAGS: Tuple[Tuple[str, str], ...] = (
+    ('Vest3YRClifMatch', 'Cliff 3'),
+    ('3YRCliffNEContr', 'Cliff 3'),
+    ('2YRCliffNEContr', 'Cliff 2'),
+)
+
+# Short vesting labels (lowercased, spaces removed) -> the template's verbose option text
+_VESTING_VERBOSE_LABELS: Dict[str, str] = {
+    '1-25': '1-25 (0=0, 1=25, 2=50, 3=75, 4=100)',
+    '1-20': '20/Yr (0=0, 1=20, 2=40, 3=60, 4=80, 5=100)',
+    '20/yr': '20/Yr (0=0, 1=20, 2=40, 3=60, 4=80, 5=100)',
+    '20yr': '20/Yr (0=0, 1=20, 2=40, 3=60, 4=80, 5=100)',
+    '2-20': '2-20 (0=0, 1=0, 2=20, 3=40, 4=60, 5=80, 6=100)',
+    '1yr/50': '1 Yr/50 (0=0, 1=50, 2=100)',
+    '1yr50': '1 Yr/50 (0=0, 1=50, 2=100)',
+    '1=50': '1 Yr/50 (0=0, 1=50, 2=100)',
+    '1yr33.3': '1Yr 33.3 (0=0, 1=33.3, 2=66.6, 3=100)',
+    '1yr/33.3': '1Yr 33.3 (0=0, 1=33.3, 2=66.6, 3=100)',
+    '33.3': '1Yr 33.3 (0=0, 1=33.3, 2=66.6, 3=100)',
+    'cliff2': 'Cliff 2 (0=0, 1=0, 2=100)',
+    'cliff3': 'Cliff 3 (0=0, 1=0, 2=0, 3=100)',
+}
+
+
+# Prompt classifiers for choose_value_for_map_entry. They are pure on their
+# strings and get asked once per XML for the same row, so results are memoized.
+@lru_cache(maxsize=4096)
+def _is_vesting_schedule_prompt(pt: str) -> bool:
+    p = (pt or '').strip().lower()
+    return ('vesting schedule' in p) and ('describe' not in p)
+
+
+@lru_cache(maxsize=4096)
+def _is_service_req_prompt(pt: str, oa: str) -> bool:
+    pt_n = (pt or '').strip().lower()
+    if 'service requirement for eligibility' in pt_n:
+        return True
+    oa_n = (oa or '').strip().lower()
+    return oa_n.startswith('if day is selected') and 'if month is selected' in oa_n
+
+
+@lru_cache(maxsize=4096)
+def _is_vesting_describe_prompt(pt: str) -> bool:
+    pt_n = normalize_text(pt).lower()
+    return pt_n.startswith('please describe your vesting schedule')
+
+
+# Vesting schedule mapping: infer canonical labels (Immediate, 1-25, 1-20, 2-20, Cliff2)
+def _derive_vesting_label(flags: Dict[str, LinkNameFlag], quick_text: str) -> Optional[str]:
+    """Map a wide set of vesting indicators to canonical labels.
+
+    Supports Match, Non-Elective/Profit Sharing, and Safe Harbor/QACA.
+    """
+    # Graded schedules (map known flags to canonical labels used in template/LOV)
+    for nm, label in _GRADED_VESTING_FLAGS:
+        lf = flags.get(nm)
+        if lf and lf.selected == 1:
+            return label
+    # Cliff schedules
+    for nm, label in _CLIFF_VESTING_FLAGS:
+        lf = flags.get(nm)
+        if lf and lf.selected == 1:
+            return label
+    # Immediate indicators across money types (context-aware by quick_text if available)
+    qt = (quick_text or '').lower()
+    match_immediate = ('match' in qt)
+    ne_immediate = any(k in qt for k in ('non elective', 'non-elective', 'profit'))
+    if match_immediate:
+        for nm in ('NAVestMatch', 'Vest100Match'):
             lf = flags.get(nm)
             if lf and lf.selected == 1:
-                return label
-        # Immediate indicators across money types (context-aware by quick_text if available)
-        qt = (quick_text or '').lower()
-        match_immediate = ('match' in qt)
-        ne_immediate = any(k in qt for k in ('non elective', 'non-elective', 'profit'))
-        if match_immediate:
-            for nm in ('NAVestMatch', 'Vest100Match'):
-                lf = flags.get(nm)
-                if lf and lf.selected == 1:
-                    return 'Immediate'
-        if ne_immediate:
-            for nm in ('100VestingNEContr', 'Vest100NEContr'):
-                lf = flags.get(nm)
-                if lf and lf.selected == 1:
-                    return 'Immediate'
-        # Safe Harbor/QACA fully vested
-        for nm in ('VestNAQACA', 'VestNAQACAMatch', 'VestNAQACANE'):
+                return 'Immediate'
+    if ne_immediate:
+        for nm in ('100VestingNEContr', 'Vest100NEContr'):
             lf = flags.get(nm)
             if lf and lf.selected == 1:
                 return 'Immediate'
-        return None
+    # Safe Harbor/QACA fully vested
+    for nm in ('VestNAQACA', 'VestNAQACAMatch', 'VestNAQACANE'):
+        lf = flags.get(nm)
+        if lf and lf.selected == 1:
+            return 'Immediate'
+    return None
 
-    def _expand_vesting_label_from_options(short_label: str, options_allowed: str) -> Optional[str]:
-        if not short_label or not options_allowed:
-            return None
-        # Prepare candidate starts for matching
-        s = short_label.strip().lower().replace(' ', '')
-        cand_prefixes = {s}
-        # Handle synonyms
-        if s in ('cliff2', 'cliff3'):
-            cand_prefixes.add(s.replace('cliff', 'cliff '))  # 'cliff 2'
-        if s == '1-20':
-            cand_prefixes.add('20/yr')
-        if s == '1yr/50' or s == '1yr50' or s == '1=50':
-            cand_prefixes |= {'1yr/50', '1 yr/50', '1yr50'}
-        # Scan lines and pick first that matches any candidate
-        txt = options_allowed.replace('\\n', '\n')
+
+def _expand_vesting_label_from_options(short_label: str, options_allowed: str) -> Optional[str]:
+    if not short_label or not options_allowed:
+        return None
+    # Prepare candidate starts for matching
+    s = short_label.strip().lower().replace(' ', '')
+    cand_prefixes = {s}
+    # Handle synonyms
+    if s in ('cliff2', 'cliff3'):
+        cand_prefixes.add(s.replace('cliff', 'cliff '))  # 'cliff 2'
+    if s == '1-20':
+        cand_prefixes.add('20/yr')
+    if s == '1yr/50' or s == '1yr50' or s == '1=50':
+        cand_prefixes |= {'1yr/50', '1 yr/50', '1yr50'}
+    # Scan lines and pick first that matches any candidate
+    txt = options_allowed.replace('\\n', '\n')
+    for line in txt.splitlines():
+        raw = line.strip().strip('"')
+        low = raw.lower()
+        low_cmp = low.replace(' ', '')
+        for pref in cand_prefixes:
+            if low_cmp.startswith(pref):
+                return raw
+    # As a fallback, if '20/Yr' is present and short is 1-20, prefer that
+    if s == '1-20':
         for line in txt.splitlines():
             raw = line.strip().strip('"')
-            low = raw.lower()
-            low_cmp = low.replace(' ', '')
-            for pref in cand_prefixes:
-                if low_cmp.startswith(pref):
-                    return raw
-        # As a fallback, if '20/Yr' is present and short is 1-20, prefer that
-        if s == '1-20':
-            for line in txt.splitlines():
-                raw = line.strip().strip('"')
-                if raw.lower().startswith('20/yr'):
-                    return raw
-        return None
+            if raw.lower().startswith('20/yr'):
+                return raw
+    return None
+
+
+def _canonical_verbose(label: str) -> Optional[str]:
+    # Canonical verbose mapping regardless of current row options
+    s = (label or '').strip().lower().replace(' ', '')
+    verbose = _VESTING_VERBOSE_LABELS.get(s)
+    if verbose is None and s.startswith('immediate'):
+        verbose = 'Immediate (100% immediate vesting)'
+    return verbose
+
+
+def _extract_numeric_service_req(flags: Dict[str, LinkNameFlag], oa: str) -> Optional[str]:
+    # 1) Explicit "OtherServReq" free-text like "Sixty Days (60)" -> extract number in parentheses or digits
+    for k in ['OtherServReq']:
+        lf = flags.get(k)
+        if lf and lf.text:
+            txt = lf.text.strip()
+            m = _SERVICE_NUM_RE.search(txt)
+            if m:
+                return m.group(1)
+    # 2) Numeric text values on known fields
+    for k in ['ConsecMonthsServReq', 'APPMCEligMonthsServ', 'MCEligMonthsServ']:
+        lf = flags.get(k)
+        if lf and lf.text and (lf.text.strip().isdigit()):
+            return lf.text.strip()
+    # 3) Generic scan: any numeric text on keys that look relevant
+    for name, lf in flags.items():
+        if not lf or not lf.text:
+            continue
+        n = lf.text.strip()
+        if not n.isdigit():
+            continue
+        name_l = name.lower()
+        if any(tok in name_l for tok in ['serv', 'elig', 'month', 'day', 'year']):
+            return n
+    return None
 
+
+def _extract_vesting_other_text(flags: Dict[str, LinkNameFlag]) -> Optional[str]:
+    # Common free-text holders seen in ASW XMLs
+    for k in ('OtherVestProvisions', 'VestOtherMatch'):
+        lf = flags.get(k)
+        if lf and (lf.text or '').strip():
+            return lf.text.strip()
+    # Fallback: any linkname containing Vest and Other with text
+    for name, lf in flags.items():
+        if ('Vest' in name or 'Vesting' in name) and 'Other' in name and (lf.text or '').strip():
+            return lf.text.strip()
+    return None
+
+
+# Option-line and linkname tokenizers for choose_value_for_map_entry. The same
+# Options Allowed lines and linknames recur for every XML, so the token sets
+# are memoized (frozen, since callers only read them)
+def _normalize_option_word(w: str) -> str:
+    w = w.lower()
+    w = w.replace('%',' percent ')
+    w = w.replace('percents','percent').replace('percentages','percent').replace('perc','percent')
+    w = w.replace('dollars','dollar')
+    w = w.replace('semi-monthly','semi monthly')
+    w = _NON_ALNUM_RE.sub(' ', w)
+    return w.strip()
+
+
+@lru_cache(maxsize=4096)
+def _option_tokens(line: str) -> frozenset:
+    n = _normalize_option_word(line)
+    return frozenset(t for t in n.split() if len(t) >= 2)
+
+
+@lru_cache(maxsize=8192)
+def _linkname_keywords(name: str) -> frozenset:
+    n = name.lower()
+    kws = set()
+    if 'dollar' in n:
+        kws.add('dollar')
+    if 'perc' in n or 'percent' in n:
+        kws.add('percent')
+    for k in ['eaca','qaca','aca','eqac']:
+        if k in n:
+            kws.add(k)
+    for k in ['match','profit','non elective','nonelective','immediate','monthly','quarterly','semi','semi annual','annual','weekly','cliff','graded','retire','disability','death','early','vesting','vest']:
+        if k in n:
+            kws.add(k)
+    # numbers like 1,2,3,4,5,7,10 etc
+    nums = set(_DIGITS_RE.findall(n))
+    for num in nums:
+        kws.add(num)
+    if 'yr' in n or 'year' in n:
+        kws.add('yr')
+    return frozenset(kws)
+
+
+def choose_value_for_map_entry(map_entry: Dict[str, object], options_allowed: str, link_flags: Dict[str, LinkNameFlag], prompt_text: str) -> Optional[str]:
     if _is_vesting_schedule_prompt(prompt_text):
         vlabel = _derive_vesting_label(link_flags, str(map_entry.get('quick') or ''))
         if vlabel is not None:
             # Canonical verbose mapping regardless of current row options
-            def _canonical_verbose(label: str) -> Optional[str]:
-                s = (label or '').strip().lower().replace(' ', '')
-                if s in ('1-25',):
-                    return '1-25 (0=0, 1=25, 2=50, 3=75, 4=100)'
-                if s in ('1-20', '20/yr', '20yr'):
-                    return '20/Yr (0=0, 1=20, 2=40, 3=60, 4=80, 5=100)'
-                if s in ('2-20',):
-                    return '2-20 (0=0, 1=0, 2=20, 3=40, 4=60, 5=80, 6=100)'
-                if s in ('1yr/50', '1yr50', '1=50'):
-                    return '1 Yr/50 (0=0, 1=50, 2=100)'
-                if s in ('1yr33.3', '1yr/33.3', '33.3'):
-                    return '1Yr 33.3 (0=0, 1=33.3, 2=66.6, 3=100)'
-                if s in ('cliff2', 'cliff 2'):
-                    return 'Cliff 2 (0=0, 1=0, 2=100)'
-                if s in ('cliff3', 'cliff 3'):
-                    return 'Cliff 3 (0=0, 1=0, 2=0, 3=100)'
-                if s.startswith('immediate') or s == 'immediate':
-                    return 'Immediate (100% immediate vesting)'
-                return None
             canon = _canonical_verbose(vlabel)
             if canon:
                 return canon
@@ -381,60 +602,6 @@ def choose_value_for_map_entry(map_entry: Dict[str, object], options_allowed: st
             expanded = _expand_vesting_label_from_options(vlabel, options_allowed)
             return expanded or vlabel
     # Prompt-specific heuristics first
-    def _is_service_req_prompt(pt: str, oa: str) -> bool:
-        pt_n = (pt or '').strip().lower()
-        if 'service requirement for eligibility' in pt_n:
-            return True
-        oa_n = (oa or '').strip().lower()
-        return oa_n.startswith('if day is selected') and 'if month is selected' in oa_n
-
-    def _extract_numeric_service_req(flags: Dict[str, LinkNameFlag], oa: str) -> Optional[str]:
-        # 1) Explicit "OtherServReq" free-text like "Sixty Days (60)" -> extract number in parentheses or digits
-        for k in ['OtherServReq']:
-            lf = flags.get(k)
-            if lf and lf.text:
-                import re as _re
-                txt = lf.text.strip()
-                m = _re.search(r'(\d{1,3})', txt)
-                if m:
-                    return m.group(1)
-        # 2) Numeric text values on known fields
-        for k in ['ConsecMonthsServReq', 'APPMCEligMonthsServ', 'MCEligMonthsServ']:
-            lf = flags.get(k)
-            if lf and lf.text and (lf.text.strip().isdigit()):
-                return lf.text.strip()
-        # 3) Generic scan: any numeric text on keys that look relevant
-        for name, lf in flags.items():
-            if not lf or not lf.text:
-                continue
-            n = lf.text.strip()
-            if not n.isdigit():
-                continue
-            name_l = name.lower()
-            if any(tok in name_l for tok in ['serv', 'elig', 'month', 'day', 'year']):
-                return n
-        return None
-
-    def _is_vesting_describe_prompt(pt: str) -> bool:
-        pt_n = normalize_text(pt).lower()
-        return pt_n.startswith('please describe your vesting schedule')
-
-    def _extract_vesting_other_text(flags: Dict[str, LinkNameFlag]) -> Optional[str]:
-        # Common free-text holders seen in ASW XMLs
-        preferred = [
-            'OtherVestProvisions',
-            'VestOtherMatch',
-        ]
-        for k in preferred:
-            lf = flags.get(k)
-            if lf and (lf.text or '').strip():
-                return lf.text.strip()
-        # Fallback: any linkname containing Vest and Other with text
-        for name, lf in flags.items():
-            if ('Vest' in name or 'Vesting' in name) and 'Other' in name and (lf.text or '').strip():
-                return lf.text.strip()
-        return None
-
     # Handle service requirement prompt early to avoid falling back to Options Allowed blurb
     if _is_service_req_prompt(prompt_text, options_allowed):
         num = _extract_numeric_service_req(link_flags, options_allowed)
@@ -495,9 +662,9 @@ def choose_value_for_map_entry(map_entry: Dict[str, object], options_allowed: st
                     if q:
                         return q
                 if _looks_yes_no_prompt(prompt_text, options_allowed):
-                    if re.search(r'yes', chosen_name, re.IGNORECASE):
+                    if _YES_RE.search(chosen_name):
                         return 'Yes'
-                    if re.search(r'no', chosen_name, re.IGNORECASE):
+                    if _NO_RE.search(chosen_name):
                         return 'No'
                     return 'Yes'
                 # Avoid leaking internal linkname to the sheet
@@ -541,48 +708,16 @@ def choose_value_for_map_entry(map_entry: Dict[str, object], options_allowed: st
 
         # Which of these are selected?
         selected_names = [n for n in all_names if (link_flags.get(n) and link_flags[n].selected == 1)]
-        def normalize_word(w: str) -> str:
-            w = w.lower()
-            w = w.replace('%',' percent ')
-            w = w.replace('percents','percent').replace('percentages','percent').replace('perc','percent')
-            w = w.replace('dollars','dollar')
-            w = w.replace('semi-monthly','semi monthly')
-            w = re.sub(r'[^a-z0-9]+',' ', w)
-            return w.strip()
-        def option_tokens(line: str) -> set:
-            n = normalize_word(line)
-            return set(t for t in n.split() if len(t) >= 2)
-        def linkname_keywords(name: str) -> set:
-            n = name.lower()
-            kws = set()
-            if 'dollar' in n:
-                kws.add('dollar')
-            if 'perc' in n or 'percent' in n:
-                kws.add('percent')
-            for k in ['eaca','qaca','aca','eqac']:
-                if k in n:
-                    kws.add(k)
-            for k in ['match','profit','non elective','nonelective','immediate','monthly','quarterly','semi','semi annual','annual','weekly','cliff','graded','retire','disability','death','early','vesting','vest']:
-                if k in n:
-                    kws.add(k)
-            # numbers like 1,2,3,4,5,7,10 etc
-            import re as _re
-            nums = set(_re.findall(r'(\d+)', n))
-            for num in nums:
-                kws.add(num)
-            if 'yr' in n or 'year' in n:
-                kws.add('yr')
-            return kws
         token_lines = [t.strip().strip('"') for t in tokens_text.splitlines() if t.strip()]
-        token_sets = [(t, option_tokens(t)) for t in token_lines]
+        token_sets = [(t, _option_tokens(t)) for t in token_lines]
         sel_kw = set()
         for n in selected_names:
-            sel_kw |= linkname_keywords(n)
+            sel_kw |= _linkname_keywords(n)
         # If no map-referenced names selected, fall back to global selected linknames to infer tokens
         if (not selected_names) or (not sel_kw):
             for name, lf in link_flags.items():
                 if lf.selected == 1:
-                    sel_kw |= linkname_keywords(name)
+                    sel_kw |= _linkname_keywords(name)
         # Domain-specific quick rules for common options
         tok_all = tokens_text.lower()
         # Safe harbor: Match vs Profit Sharing
@@ -655,44 +790,60 @@ def _enforce_yes_no(prompt_text: str, options_allowed: str, value: Optional[str]
         recomputed = choose_value_for_map_entry(map_entry, options_allowed, link_flags, prompt_text)
         if recomputed and recomputed.strip().lower() in ('yes', 'no'):
             return 'Yes' if recomputed.strip().lower() == 'yes' else 'No'
-        # If any mapped linkname is selected, treat as Yes
-        names = []
+        # If any mapped linkname is selected, treat as Yes (stop at the first one)
         for opt in (map_entry.get('options') or []):
-            names.extend(opt.get('linknames', []))
-        for n in [x.strip() for x in str(map_entry.get('linknames') or '').split(',') if x.strip()]:
-            names.append(n)
-        if any((link_flags.get(n) and link_flags[n].selected == 1) for n in names):
-            return 'Yes'
+            for n in opt.get('linknames', []):
+                lf = link_flags.get(n)
+                if lf and lf.selected == 1:
+                    return 'Yes'
+        for x in str(map_entry.get('linknames') or '').split(','):
+            n = x.strip()
+            lf = link_flags.get(n) if n else None
+            if lf and lf.selected == 1:
+                return 'Yes'
         # None selected
         return None if strict else 'No'
     return None if strict else 'No'
 
 
+# Compiled once; these run per prompt for every XML
+_YES_NO_PROMPT_RE = re.compile(r'^(is|does|will|are|has|have)\b')
+_YES_RE = re.compile(r'yes', re.IGNORECASE)
+_NO_RE = re.compile(r'no', re.IGNORECASE)
+
+
+# Pure on its two strings and asked for every XML of a row, so memoize it
+@lru_cache(maxsize=4096)
 def _looks_yes_no_prompt(prompt_text: str, options_allowed: str) -> bool:
     p = (prompt_text or '').strip().lower()
     if 'y/n' in (options_allowed or '').lower():
         return True
     # Heuristic: questions starting with is/does/will/are/has/have
-    return bool(p.endswith('?') and re.match(r'^(is|does|will|are|has|have)\b', p))
+    return bool(p.endswith('?') and _YES_NO_PROMPT_RE.match(p))
 
 
-def choose_value_for_prompt(linkcsv: str, options_allowed: str, link_flags: Dict[str, LinkNameFlag], quick_text: str, prompt_text: str = '') -> Optional[str]:
-    def related_text(name: str) -> Optional[str]:
-        lf = link_flags.get(name)
+# Sibling linknames that carry the numeric/text value for a flag-style name
+_RELATED_TEXT_SUFFIXES = ('Age', 'Amt', 'Amount', 'Perc', 'Percent', 'Dollar', 'Dollars')
+
+
+def _related_text(name: str, link_flags: Dict[str, LinkNameFlag]) -> Optional[str]:
+    lf = link_flags.get(name)
+    if lf and (lf.text or '').strip():
+        return lf.text
+    # Heuristic: strip 'Main' suffix to find actual numeric/text value
+    if name.endswith('Main'):
+        lf = link_flags.get(name[:-4])
         if lf and (lf.text or '').strip():
             return lf.text
-        # Heuristic: strip 'Main' suffix to find actual numeric/text value
-        if name.endswith('Main'):
-            base = name[:-4]
-            lf2 = link_flags.get(base)
-            if lf2 and (lf2.text or '').strip():
-                return lf2.text
-        # Try common suffix variants
-        for suf in ['Age','Amt','Amount','Perc','Percent','Dollar','Dollars']:
-            lf3 = link_flags.get(f"{name}{suf}")
-            if lf3 and (lf3.text or '').strip():
-                return lf3.text
-        return None
+    # Try common suffix variants
+    for suf in _RELATED_TEXT_SUFFIXES:
+        lf = link_flags.get(name + suf)
+        if lf and (lf.text or '').strip():
+            return lf.text
+    return None
+
+
+def choose_value_for_prompt(linkcsv: str, options_allowed: str, link_flags: Dict[str, LinkNameFlag], quick_text: str, prompt_text: str = '') -> Optional[str]:
     names = [n.strip() for n in (linkcsv or '').split(',') if n.strip()]
     if not names:
         return None
@@ -705,7 +856,7 @@ def choose_value_for_prompt(linkcsv: str, options_allowed: str, link_flags: Dict
         if _looks_yes_no_prompt(prompt_text, options_allowed):
             return 'Yes' if lf.selected == 1 else 'No'
         # Non Y/N: return text value if present
-        txt = related_text(names[0])
+        txt = _related_text(names[0], link_flags)
         if txt:
             return txt
         # Heuristic: if linkname itself starts with Yes/No and selected signifies choose that
@@ -731,16 +882,16 @@ def choose_value_for_prompt(linkcsv: str, options_allowed: str, link_flags: Dict
 
     # If Y/N, infer from name if possible
     if _looks_yes_no_prompt(prompt_text, options_allowed):
-        if re.search(r'yes', chosen, re.IGNORECASE):
+        if _YES_RE.search(chosen):
             return 'Yes'
-        if re.search(r'no', chosen, re.IGNORECASE):
+        if _NO_RE.search(chosen):
             return 'No'
         # Fallback: selected implies Yes
         return 'Yes'
 
     # If selected link has a concrete text value, use it
     if chosen_info:
-        txt = related_text(chosen)
+        txt = _related_text(chosen, link_flags)
         if txt:
             return txt
 
@@ -755,8 +906,21 @@ def choose_value_for_prompt(linkcsv: str, options_allowed: str, link_flags: Dict
 
 
 def parse_lov(datapoints_xlsx: Path) -> Dict[Tuple[str, str], List[str]]:
+    """Return LOV options keyed by (page, seq); {} when the sheet is unreadable.
+
+    Cached per file like parse_map_workbook, so treat the result as read-only.
+    """
+    try:
+        st = Path(datapoints_xlsx).stat()
+    except Exception:
+        return {}
+    return _parse_lov_cached(str(datapoints_xlsx), st.st_mtime_ns, st.st_size)
+
+
+@lru_cache(maxsize=8)
+def _parse_lov_cached(path: str, mtime_ns: int, size: int) -> Dict[Tuple[str, str], List[str]]:
     try:
-        rows = read_xlsx_named_sheet_rows(datapoints_xlsx, 'LOV')
+        rows = _read_xlsx_named_sheet_rows_cached(path, mtime_ns, size, 'LOV')
     except Exception:
         return {}
     lov: Dict[Tuple[str, str], List[str]] = {}
@@ -812,33 +976,32 @@ def smart_default(prompt_text: str, options_allowed: str) -> str:
     return 'None'
 
 
+# Common instruction patterns we should never paste into the sheet
+_INSTRUCTION_RE = re.compile(
+    r'if y(?=.*page)(?=.*seq)'
+    r'|enter '
+    r'|.*this information will not be loaded'
+    r'|(?=.*if day is selected).*if month is selected',
+    re.I,
+)
+
+
 def pick_from_options_allowed(options_allowed: str) -> Optional[str]:
     if not options_allowed:
         return None
     txt = options_allowed.replace('\\n', '\n')
-    def _is_instruction(s: str) -> bool:
-        s_low = s.lower()
-        # Common instruction patterns we should never paste into the sheet
-        if s_low.startswith('if y') and ('page' in s_low and 'seq' in s_low):
-            return True
-        if s_low.startswith('enter '):
-            return True
-        if 'this information will not be loaded' in s_low:
-            return True
-        if 'if day is selected' in s_low and 'if month is selected' in s_low:
-            return True
-        return False
     for line in txt.splitlines():
         line = line.strip().strip('"')
         if not line:
             continue
-        if _is_instruction(line):
+        if _INSTRUCTION_RE.match(line):
             continue
         return line
     return None
 
 
-def fill_plan1(datapoints_xlsx: Path, map_xlsx: Path, link_flags: Dict[str, LinkNameFlag], strict: bool = False) -> List[List[str]]:
+def fill_plan1(datapoints_xlsx: Path, map_xlsx: Path, link_flags: Dict[str, LinkNameFlag], strict: bool = False,
+               map_data: Optional[Dict[str, Dict[str, object]]] = None, lov: Optional[Dict[Tuple[str, str], List[str]]] = None) -> List[List[str]]:
     rows = read_xlsx_named_sheet_rows(datapoints_xlsx, 'Plan Express Data Points')
     if not rows:
         return []
@@ -874,9 +1037,11 @@ def fill_plan1(datapoints_xlsx: Path, map_xlsx: Path, link_flags: Dict[str, Link
     except ValueError:
         i_plan1 = -1
 
-    # Build prompt -> linknames mapping
-    map_data = parse_map_workbook(map_xlsx)
-    lov = parse_lov(datapoints_xlsx)
+    # Build prompt -> linknames mapping (callers may pass pre-parsed data)
+    if map_data is None:
+        map_data = parse_map_workbook(map_xlsx)
+    if lov is None:
+        lov = parse_lov(datapoints_xlsx)
 
     out_rows: List[List[str]] = []
     out_header = header.copy()
@@ -887,19 +1052,20 @@ def fill_plan1(datapoints_xlsx: Path, map_xlsx: Path, link_flags: Dict[str, Link
     misses = 0
     hits = 0
 
-    for r in rows[1:]:
-        # Make a working copy for output
-        r_out = r.copy()
-        # Normalize length
-        if len(r_out) < len(out_header):
-            r_out += [''] * (len(out_header) - len(r_out))
+    # Pad every data row to the output width once so the loop can index directly.
+    # Rows come straight from the sheet reader, so they are filled in place.
+    width = len(out_header)
+    for r in rows:
+        if len(r) < width:
+            r.extend([''] * (width - len(r)))
 
-        prompt = normalize_text(r[i_prompt] if i_prompt < len(r) else '')
+    for r in islice(rows, 1, None):
+        prompt = normalize_text(r[i_prompt])
         if not prompt:
-            out_rows.append(r_out)
+            out_rows.append(r)
             continue
 
-        options = (r[i_options] if (0 <= i_options < len(r)) else '').strip()
+        options = r[i_options].strip() if i_options >= 0 else ''
 
         map_entry = map_data.get(prompt)
         value: Optional[str] = None
@@ -909,8 +1075,8 @@ def fill_plan1(datapoints_xlsx: Path, map_xlsx: Path, link_flags: Dict[str, Link
 
         # Deterministic fallbacks to ensure a single valid option
         if value is None:
-            page = (r[i_page] if (0 <= i_page < len(r)) else '').strip()
-            seq = (r[i_seq] if (0 <= i_seq < len(r)) else '').strip()
+            page = r[i_page].strip() if i_page >= 0 else ''
+            seq = r[i_seq].strip() if i_seq >= 0 else ''
             value = fallback_from_lov(page, seq, options, lov)
         if value is None:
             pick = pick_from_options_allowed(options)
@@ -920,18 +1086,16 @@ def fill_plan1(datapoints_xlsx: Path, map_xlsx: Path, link_flags: Dict[str, Link
             value = smart_default(prompt, options)
 
         if i_plan1 >= 0:
-            if i_plan1 >= len(r_out):
-                r_out += [''] * (i_plan1 - len(r_out) + 1)
-            r_out[i_plan1] = value or ''
+            r[i_plan1] = value or ''
         else:
-            r_out[-1] = value or ''
+            r[-1] = value or ''
 
         if value is None:
             misses += 1
         else:
             hits += 1
 
-        out_rows.append(r_out)
+        out_rows.append(r)
 
     sys.stderr.write(f"Mapping complete. Hits: {hits}, Misses: {misses}\n")
     return out_rows
@@ -939,12 +1103,15 @@ def fill_plan1(datapoints_xlsx: Path, map_xlsx: Path, link_flags: Dict[str, Link
 
 def write_csv(rows: List[List[str]], out_path: Path) -> None:
     out_path.parent.mkdir(parents=True, exist_ok=True)
-    with out_path.open('w', newline='', encoding='utf-8') as f:
-        writer = csv.writer(f)
-        for r in rows:
-            writer.writerow(r)
+    with out_path.open('w', newline='', encoding='utf-8', buffering=1 << 20) as f:
+        csv.writer(f).writerows(rows)
 
 
+# Column letters and row number of an A1-style cell reference
+_CELL_REF_RE = re.compile(r'([A-Z]+)(\d+)')
+
+
+@lru_cache(maxsize=1024)
 def _col_letter_to_num(col: str) -> int:
     n = 0
     for ch in col:
@@ -997,8 +1164,19 @@ def _set_cell_inline_str(c: ET.Element, text: str) -> None:
     c.append(is_el)
 
 
-def fill_plan1_in_xlsx(datapoints_xlsx: Path, map_xlsx: Path, link_flags: Dict[str, LinkNameFlag], out_xlsx: Path, strict: bool = False) -> None:
-    # Read shared strings and locate target sheet
+def _copy_zip_entry(zin: ZipFile, zout: ZipFile, info: ZipInfo) -> None:
+    # Stream member to member instead of materialising each entry in memory;
+    # the stdlib cannot copy compressed bytes verbatim, so this is the cheapest path.
+    # A copy of the source ZipInfo keeps its extra fields, comment and create_system
+    zi = copy.copy(info)
+    with zin.open(info) as src, zout.open(zi, 'w') as dst:
+        shutil.copyfileobj(src, dst, 1 << 20)
+
+
+def fill_plan1_in_xlsx(datapoints_xlsx: Path, map_xlsx: Path, link_flags: Dict[str, LinkNameFlag], out_xlsx: Path, strict: bool = False,
+                       map_data: Optional[Dict[str, Dict[str, object]]] = None, lov: Optional[Dict[Tuple[str, str], List[str]]] = None) -> None:
+    # Keep the source archive open for the whole pass: it is read for the
+    # sheet up front and again when copying the untouched entries out.
     with ZipFile(datapoints_xlsx, 'r') as zin:
         strings = _xlsx_shared_strings(zin)
         targets = _xlsx_sheet_targets(zin)
@@ -1012,136 +1190,140 @@ def fill_plan1_in_xlsx(datapoints_xlsx: Path, map_xlsx: Path, link_flags: Dict[s
         with zin.open(sheet_target) as f:
             sheet_root = ET.parse(f).getroot()
 
-    ns = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
-    # Find header row (look for one containing PROMPT)
-    rows = sheet_root.findall(f'.//{{{ns}}}row')
-    header_row_el: Optional[ET.Element] = None
-    for row in rows[:5]:
-        texts = [_get_cell_value_text(c, strings).strip() for c in row.findall(f'{{{ns}}}c')]
-        if any(normalize_text(t).upper() == 'PROMPT' for t in texts):
-            header_row_el = row
-            break
-    if header_row_el is None:
-        raise RuntimeError('Header row with PROMPT not found')
-
-    # Map header text -> column letter
-    header_map: Dict[str, str] = {}
-    prompt_col_letter = None
-    options_col_letter = None
-    plan1_col_letter = None
-    page_col_letter = None
-    seq_col_letter = None
-    for c in header_row_el.findall(f'{{{ns}}}c'):
-        rref = c.get('r') or ''
-        # Extract column letters
-        m = re.match(r'([A-Z]+)(\d+)', rref)
-        if not m:
-            continue
-        col_letter = m.group(1)
-        text = normalize_text(_get_cell_value_text(c, strings))
-        if not text:
-            continue
-        key = text
-        header_map[key] = col_letter
-        if key.upper() == 'PROMPT':
-            prompt_col_letter = col_letter
-        elif key.lower() == 'options allowed':
-            options_col_letter = col_letter
-        elif key.lower() == 'plan 1':
-            plan1_col_letter = col_letter
-        elif key.lower() == 'page':
-            page_col_letter = col_letter
-        elif key.lower() == 'seq':
-            seq_col_letter = col_letter
-
-    if not prompt_col_letter:
-        raise RuntimeError('PROMPT column letter not identified')
-    if not plan1_col_letter:
-        # If "Plan 1" header missing, create it at the end of header row
-        # Determine max column used
-        used_cols = [_col_letter_to_num(m.group(1)) for m in (re.match(r'([A-Z]+)\d+', (c.get('r') or '')) for c in header_row_el.findall(f'{{{ns}}}c')) if m]
-        next_col_num = max(used_cols) + 1 if used_cols else 1
-        plan1_col_letter = _col_num_to_letter(next_col_num)
-        # Create header cell
-        hcell = ET.Element(f'{{{ns}}}c', {'r': _cell_ref(plan1_col_letter, int(header_row_el.get('r') or '1'))})
-        _set_cell_inline_str(hcell, 'Plan 1')
-        header_row_el.append(hcell)
-
-    # Build map data from Map workbook
-    map_data = parse_map_workbook(map_xlsx)
-    lov = parse_lov(datapoints_xlsx)
-
-    # Prepare loop over data rows
-    for row in rows:
-        rnum = int(row.get('r') or '0')
-        if row is header_row_el or rnum <= int(header_row_el.get('r') or '1'):
-            continue
-        # Locate prompt cell and options cell
-        prompt_cell = None
-        options_cell = None
-        plan1_cell = None
-        for c in row.findall(f'{{{ns}}}c'):
+        ns = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+        # Find header row (look for one containing PROMPT)
+        rows = sheet_root.findall(f'.//{{{ns}}}row')
+        header_row_el: Optional[ET.Element] = None
+        for row in rows[:5]:
+            texts = [_get_cell_value_text(c, strings).strip() for c in row.findall(f'{{{ns}}}c')]
+            if any(normalize_text(t).upper() == 'PROMPT' for t in texts):
+                header_row_el = row
+                break
+        if header_row_el is None:
+            raise RuntimeError('Header row with PROMPT not found')
+
+        # Map header text -> column letter
+        header_map: Dict[str, str] = {}
+        prompt_col_letter = None
+        options_col_letter = None
+        plan1_col_letter = None
+        page_col_letter = None
+        seq_col_letter = None
+        for c in header_row_el.findall(f'{{{ns}}}c'):
             rref = c.get('r') or ''
-            m = re.match(r'([A-Z]+)(\d+)', rref)
+            # Extract column letters
+            m = _CELL_REF_RE.match(rref)
             if not m:
                 continue
             col_letter = m.group(1)
-            if col_letter == prompt_col_letter:
-                prompt_cell = c
-            elif options_col_letter and col_letter == options_col_letter:
-                options_cell = c
-            elif col_letter == plan1_col_letter:
-                plan1_cell = c
-            elif page_col_letter and col_letter == page_col_letter:
-                page_cell = c
-            elif seq_col_letter and col_letter == seq_col_letter:
-                seq_cell = c
-
-        # Read prompt text
-        prompt_text = normalize_text(_get_cell_value_text(prompt_cell, strings) if prompt_cell is not None else '')
-        if not prompt_text:
-            continue
-        options_text = (_get_cell_value_text(options_cell, strings) if options_cell is not None else '').strip()
-        page_text = (_get_cell_value_text(locals().get('page_cell'), strings) if 'page_cell' in locals() else '').strip()
-        seq_text = (_get_cell_value_text(locals().get('seq_cell'), strings) if 'seq_cell' in locals() else '').strip()
+            text = normalize_text(_get_cell_value_text(c, strings))
+            if not text:
+                continue
+            key = text
+            header_map[key] = col_letter
+            key_lower = key.lower()
+            if key.upper() == 'PROMPT':
+                prompt_col_letter = col_letter
+            elif key_lower == 'options allowed':
+                options_col_letter = col_letter
+            elif key_lower == 'plan 1':
+                plan1_col_letter = col_letter
+            elif key_lower == 'page':
+                page_col_letter = col_letter
+            elif key_lower == 'seq':
+                seq_col_letter = col_letter
+
+        if not prompt_col_letter:
+            raise RuntimeError('PROMPT column letter not identified')
+        if not plan1_col_letter:
+            # If "Plan 1" header missing, create it at the end of header row
+            # Determine max column used
+            used_cols = [_col_letter_to_num(m.group(1)) for m in (_CELL_REF_RE.match(c.get('r') or '') for c in header_row_el.findall(f'{{{ns}}}c')) if m]
+            next_col_num = max(used_cols) + 1 if used_cols else 1
+            plan1_col_letter = _col_num_to_letter(next_col_num)
+            # Create header cell
+            hcell = ET.Element(f'{{{ns}}}c', {'r': _cell_ref(plan1_col_letter, int(header_row_el.get('r') or '1'))})
+            _set_cell_inline_str(hcell, 'Plan 1')
+            header_row_el.append(hcell)
+
+        # Build map data from Map workbook (callers may pass pre-parsed data)
+        if map_data is None:
+            map_data = parse_map_workbook(map_xlsx)
+        if lov is None:
+            lov = parse_lov(datapoints_xlsx)
+
+        # Prepare loop over data rows
+        for row in rows:
+            rnum = int(row.get('r') or '0')
+            if row is header_row_el or rnum <= int(header_row_el.get('r') or '1'):
+                continue
+            # Locate prompt cell and options cell
+            prompt_cell = None
+            options_cell = None
+            plan1_cell = None
+            for c in row.findall(f'{{{ns}}}c'):
+                rref = c.get('r') or ''
+                m = _CELL_REF_RE.match(rref)
+                if not m:
+                    continue
+                col_letter = m.group(1)
+                if col_letter == prompt_col_letter:
+                    prompt_cell = c
+                elif options_col_letter and col_letter == options_col_letter:
+                    options_cell = c
+                elif col_letter == plan1_col_letter:
+                    plan1_cell = c
+                elif page_col_letter and col_letter == page_col_letter:
+                    page_cell = c
+                elif seq_col_letter and col_letter == seq_col_letter:
+                    seq_cell = c
+
+            # Read prompt text
+            prompt_text = normalize_text(_get_cell_value_text(prompt_cell, strings) if prompt_cell is not None else '')
+            if not prompt_text:
+                continue
+            options_text = (_get_cell_value_text(options_cell, strings) if options_cell is not None else '').strip()
+            page_text = (_get_cell_value_text(locals().get('page_cell'), strings) if 'page_cell' in locals() else '').strip()
+            seq_text = (_get_cell_value_text(locals().get('seq_cell'), strings) if 'seq_cell' in locals() else '').strip()
+
+            map_entry = map_data.get(prompt_text)
+            value = None
+            if map_entry:
+                value = choose_value_for_map_entry(map_entry, options_text, link_flags, prompt_text)
+                value = _enforce_yes_no(prompt_text, options_text, value, link_flags, map_entry, strict)
+            # Deterministic fallbacks to ensure a single valid option
+            if value is None:
+                value = fallback_from_lov(page_text, seq_text, options_text, lov)
+            if value is None:
+                pick = pick_from_options_allowed(options_text)
+                if pick:
+                    value = pick
+            if not strict and value is None:
+                value = smart_default(prompt_text, options_text)
+
+            # Ensure plan1 cell exists
+            if plan1_cell is None:
+                plan1_cell = ET.Element(f'{{{ns}}}c', {'r': _cell_ref(plan1_col_letter, rnum)})
+                row.append(plan1_cell)
+            _set_cell_inline_str(plan1_cell, value)
+
+        # Write out the modified workbook as a new zip
+        with ZipFile(out_xlsx, 'w') as zout:
+            for info in zin.infolist():
+                name = info.filename
+                if name == sheet_target:
+                    # Write modified sheet
+                    data = ET.tostring(sheet_root, encoding='utf-8', xml_declaration=True)
+                    zi = ZipInfo(filename=name, date_time=info.date_time)
+                    zi.compress_type = info.compress_type
+                    zi.external_attr = info.external_attr
+                    zout.writestr(zi, data)
+                else:
+                    _copy_zip_entry(zin, zout, info)
 
-        map_entry = map_data.get(prompt_text)
-        value = None
-        if map_entry:
-            value = choose_value_for_map_entry(map_entry, options_text, link_flags, prompt_text)
-            value = _enforce_yes_no(prompt_text, options_text, value, link_flags, map_entry, strict)
-        # Deterministic fallbacks to ensure a single valid option
-        if value is None:
-            value = fallback_from_lov(page_text, seq_text, options_text, lov)
-        if value is None:
-            pick = pick_from_options_allowed(options_text)
-            if pick:
-                value = pick
-        if not strict and value is None:
-            value = smart_default(prompt_text, options_text)
-
-        # Ensure plan1 cell exists
-        if plan1_cell is None:
-            plan1_cell = ET.Element(f'{{{ns}}}c', {'r': _cell_ref(plan1_col_letter, rnum)})
-            row.append(plan1_cell)
-        _set_cell_inline_str(plan1_cell, value)
-
-    # Write out the modified workbook as a new zip
-    with ZipFile(datapoints_xlsx, 'r') as zin, ZipFile(out_xlsx, 'w') as zout:
-        for info in zin.infolist():
-            name = info.filename
-            if name == sheet_target:
-                # Write modified sheet
-                data = ET.tostring(sheet_root, encoding='utf-8', xml_declaration=True)
-                zi = ZipInfo(filename=name, date_time=info.date_time)
-                zi.compress_type = info.compress_type
-                zi.external_attr = info.external_attr
-                zout.writestr(zi, data)
-            else:
-                zout.writestr(info, zin.read(name))
-
-
-def build_strict_qa(datapoints_xlsx: Path, map_xlsx: Path, link_flags: Dict[str, LinkNameFlag]) -> List[List[str]]:
+
+def build_strict_qa(datapoints_xlsx: Path, map_xlsx: Path, link_flags: Dict[str, LinkNameFlag],
+                    map_data: Optional[Dict[str, Dict[str, object]]] = None) -> List[List[str]]:
     """Build a QA table under strict logic without defaults.
 
     Columns:
@@ -1159,7 +1341,8 @@ def build_strict_qa(datapoints_xlsx: Path, map_xlsx: Path, link_flags: Dict[str,
     i_page = header_norm.index('Page') if 'Page' in header_norm else -1
     i_seq = header_norm.index('Seq') if 'Seq' in header_norm else -1
 
-    map_data = parse_map_workbook(map_xlsx)
+    if map_data is None:
+        map_data = parse_map_workbook(map_xlsx)
 
     out: List[List[str]] = []
     out.append(['Page','Seq','Prompt','Options Allowed','Map LinkNames','XML Selected','XML Text Values','Strict Value'])
@@ -1202,8 +1385,9 @@ def build_strict_qa(datapoints_xlsx: Path, map_xlsx: Path, link_flags: Dict[str,
                         seen.add(n)
             # also include raw csv list
             for n in [x.strip() for x in linkcsv.split(',') if x.strip()]:
-                if n not in set(all_names):
+                if n not in seen:
                     all_names.append(n)
+                    seen.add(n)
 
         # strict value
         val = None
@@ -1236,7 +1420,11 @@ def main(argv: Optional[List[str]] = None) -> int:
     args = ap.parse_args(argv)
 
     link_flags = parse_xml_linknames(args.xml)
-    rows = fill_plan1(args.datapoints, args.map, link_flags, strict=args.strict)
+    # Parse the Map workbook and LOV once and share them across the passes below
+    map_data = parse_map_workbook(args.map)
+    lov = parse_lov(args.datapoints)
+
+    rows = fill_plan1(args.datapoints, args.map, link_flags, strict=args.strict, map_data=map_data, lov=lov)
     if rows:
         out_path = args.out
         if not out_path:
@@ -1250,11 +1438,12 @@ def main(argv: Optional[List[str]] = None) -> int:
         if not x_out:
             base = args.datapoints.with_suffix('').name
             x_out = args.datapoints.parent / f'{base}_filled_plan1.xlsx'
-        fill_plan1_in_xlsx(args.datapoints, args.map, link_flags, x_out, strict=args.strict)
+        fill_plan1_in_xlsx(args.datapoints, args.map, link_flags, x_out, strict=args.strict,
+                           map_data=map_data, lov=lov)
         print(f'Wrote {x_out}')
 
     if args.qa_csv:
-        qa_rows = build_strict_qa(args.datapoints, args.map, link_flags)
+        qa_rows = build_strict_qa(args.datapoints, args.map, link_flags, map_data=map_data)
         write_csv(qa_rows, args.qa_csv)
         print(f'Wrote QA CSV {args.qa_csv}')
     return 0